@@ -42,7 +42,6 @@ setup(
         'pexpect',
         'troposphere >= 2.5.2',
         'awacs',
-        'deepdiff'
     ],
     packages=[
         'paco.adapters',
@@ -1,20 +1,47 @@
-from paco.application.reseng_acm import ACMResourceEngine
-from paco.application.reseng_apigatewayrestapi import ApiGatewayRestApiResourceEngine
-from paco.application.reseng_asg import ASGResourceEngine
-from paco.application.reseng_cloudfront import CloudFrontResourceEngine
-from paco.application.reseng_deploymentpipeline import DeploymentPipelineResourceEngine
-from paco.application.reseng_efs import EFSResourceEngine
-from paco.application.reseng_ec2 import EC2ResourceEngine
-from paco.application.reseng_elasticacheredis import ElastiCacheRedisResourceEngine
-from paco.application.reseng_eventsrule import EventsRuleResourceEngine
-from paco.application.reseng_lambda import LambdaResourceEngine
-from paco.application.reseng_lbapplication import LBApplicationResourceEngine
-from paco.application.reseng_lbclassic import LBClassicResourceEngine
-from paco.application.reseng_rds import RDSMysqlResourceEngine, DBParameterGroupResourceEngine
-from paco.application.reseng_snstopic import SNSTopicResourceEngine
-from paco.application.reseng_s3bucket import S3BucketResourceEngine
-from paco.application.reseng_eip import EIPResourceEngine
-from paco.application.reseng_ebs import EBSResourceEngine
-from paco.application.reseng_codedeployapplication import CodeDeployApplicationResourceEngine
-from paco.application.reseng_dashboard import DashboardResourceEngine
-from paco.application.reseng_elasticsearch import ElasticsearchDomainResourceEngine
+"""
+Application and Resource engines. Resource engine modules are imported when a Resource engine is first used.
+"""
+
+import importlib
+import sys
+
+# Class name: module that it is imported from
+lazy_imports = {
+    'ACMResourceEngine': 'reseng_acm',
+    'ApiGatewayRestApiResourceEngine': 'reseng_apigatewayrestapi',
+    'ASGResourceEngine': 'reseng_asg',
+    'CloudFrontResourceEngine': 'reseng_cloudfront',
+    'DeploymentPipelineResourceEngine': 'reseng_deploymentpipeline',
+    'EFSResourceEngine': 'reseng_efs',
+    'EC2ResourceEngine': 'reseng_ec2',
+    'ElastiCacheRedisResourceEngine': 'reseng_elasticacheredis',
+    'EventsRuleResourceEngine': 'reseng_eventsrule',
+    'LambdaResourceEngine': 'reseng_lambda',
+    'LBApplicationResourceEngine': 'reseng_lbapplication',
+    'LBClassicResourceEngine': 'reseng_lbclassic',
+    'RDSMysqlResourceEngine': 'reseng_rds',
+    'DBParameterGroupResourceEngine': 'reseng_rds',
+    'SNSTopicResourceEngine': 'reseng_snstopic',
+    'S3BucketResourceEngine': 'reseng_s3bucket',
+    'EIPResourceEngine': 'reseng_eip',
+    'EBSResourceEngine': 'reseng_ebs',
+    'CodeDeployApplicationResourceEngine': 'reseng_codedeployapplication',
+    'DashboardResourceEngine': 'reseng_dashboard',
+    'ElasticsearchDomainResourceEngine': 'reseng_elasticsearch',
+}
+
+def __getattr__(name):
+    "Import modules the first time one of their classes is used"
+    if name not in lazy_imports:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(__name__ + '.' + lazy_imports[name]), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(lazy_imports.keys()))
+
+if sys.version_info < (3, 7):
+    # Module __getattr__ requires Python 3.7
+    for name in lazy_imports.keys():
+        __getattr__(name)
@@ -14,9 +14,13 @@ on Windows instances.
 
 
 import paco.cftemplates
+import gzip
+import hashlib
+import io
 import json
 import os
 import pathlib
+import re
 import shutil
 import tarfile
 from paco.stack_group import StackHooks, Stack, StackTags
@@ -25,7 +29,7 @@ from paco import utils
 from paco.models import schemas, vocabulary
 from paco.models.locations import get_parent_by_interface
 from paco.models.references import Reference
-from paco.utils import md5sum, prefixed_name
+from paco.utils import md5sum, prefixed_name, write_if_changed
 from paco.core.exception import StackException
 from paco.core.exception import PacoErrorCode
 
@@ -73,9 +77,8 @@ class LaunchBundle():
         self.instance_iam_role_arn = self.paco_ctx.get_ref(instance_iam_role_arn_ref)
         self.bundles_path = os.path.join(self.build_path, 'LaunchBundles')
         self.bundle_folder = self.name
+        # the package is stored in S3 as package_filename and built as <name>-<cache_id>.tgz
         self.package_filename = str.join('.', [self.bundle_folder, 'tgz'])
-        self.package_path = os.path.join(self.bundles_path, self.package_filename)
-
 
     def set_launch_script(self, launch_script):
         """Set the script run to launch the bundle. By convention, this file
@@ -91,36 +94,61 @@ class LaunchBundle():
         }
         self.bundle_files.append(file_config)
 
+    def get_files(self):
+        "Returns the bundle's files as a list of (name, bytes) sorted by name. A file added twice has it's last contents."
+        files = {}
+        for bundle_file in self.bundle_files:
+            files[bundle_file['name']] = bundle_file['contents'].encode('utf-8')
+        return sorted(files.items())
+
+    def package_files(self, files):
+        """Tar gzips files in memory. The archive metadata is the same on every build, so the
+        same files always give the same bytes."""
+        def tar_info(name, size=0, mode=0o644, type=tarfile.REGTYPE):
+            info = tarfile.TarInfo(name)
+            info.size = size
+            info.mode = mode
+            info.type = type
+            info.mtime = 0
+            info.uid = info.gid = 0
+            info.uname = info.gname = ''
+            return info
+
+        package = io.BytesIO()
+        with gzip.GzipFile(filename='', mode='wb', fileobj=package, mtime=0) as gzip_file:
+            with tarfile.open(fileobj=gzip_file, mode='w', format=tarfile.GNU_FORMAT) as lb_tar:
+                lb_tar.addfile(tar_info(self.bundle_folder, mode=0o755, type=tarfile.DIRTYPE))
+                for name, contents in files:
+                    info = tar_info('/'.join([self.bundle_folder, name]), size=len(contents))
+                    lb_tar.addfile(info, io.BytesIO(contents))
+        return package.getvalue()
+
     def build(self):
         """Builds the launch bundle:
 
-         - Creates files for bundle in a bundles tmp dir
+         - Hashes the bundle's files to get the cache_id
 
-         - Tar gzips files
+         - Tar gzips the files in memory to <name>-<cache_id>.tgz, unless an
+           earlier build has already created this package
 
-         - Sets ref to S3 bucket and instance IAM role arn
+         - Checks the ref to the instance IAM role arn
         """
-        orig_cwd = os.getcwd()
-        pathlib.Path(self.bundles_path).mkdir(parents=True, exist_ok=True)
-        os.chdir(self.bundles_path)
-
-        # mkdir Bundle/
-        pathlib.Path(self.bundle_folder).mkdir(parents=True, exist_ok=True)
-
-        # Launch script
-        contents_md5 = ""
-        for bundle_file in self.bundle_files:
-            file_path = os.path.join(self.bundle_folder, bundle_file['name'])
-            with open(file_path, "w") as output_fd:
-                output_fd.write(bundle_file['contents'])
-            contents_md5 += md5sum(str_data=bundle_file['contents'])
-
-        self.cache_id = md5sum(str_data=contents_md5)
-
-        lb_tar = tarfile.open(self.package_filename, "w:gz")
-        lb_tar.add(self.bundle_folder, recursive=True)
-        lb_tar.close()
-        os.chdir(orig_cwd)
+        files = self.get_files()
+        contents_md5 = hashlib.md5()
+        for name, contents in files:
+            contents_md5.update(name.encode('utf-8') + b'\0')
+            contents_md5.update(hashlib.md5(contents).digest())
+        self.cache_id = contents_md5.hexdigest()
+        self.package_path = os.path.join(self.bundles_path, '{}-{}.tgz'.format(self.bundle_folder, self.cache_id))
+
+        if os.path.isfile(self.package_path) == False:
+            pathlib.Path(self.bundles_path).mkdir(parents=True, exist_ok=True)
+            write_if_changed(self.package_path, self.package_files(files))
+            # remove the packages from earlier builds of this bundle
+            package_re = re.compile(re.escape(self.bundle_folder) + r'-[0-9a-f]{32}\.tgz')
+            for path in pathlib.Path(self.bundles_path).iterdir():
+                if package_re.fullmatch(path.name) != None and str(path) != self.package_path:
+                    path.unlink()
 
         if self.instance_iam_role_arn == None:
             raise StackException(
@@ -1,44 +1,71 @@
-from paco.cftemplates.cftemplates import CFTemplate
-from paco.cftemplates.vpc import VPC
-from paco.cftemplates.segment import Segment
-from paco.cftemplates.security_groups import SecurityGroups
-from paco.cftemplates.elb import ELB
-from paco.cftemplates.alb import ALB
-from paco.cftemplates.asg import ASG
-from paco.cftemplates.iam_managed_policies import IAMManagedPolicies
-from paco.cftemplates.iam_roles import IAMRoles
-from paco.cftemplates.iam_sl_roles import IAMSLRoles
-from paco.cftemplates.s3 import S3
-from paco.cftemplates.codecommit import CodeCommit
-from paco.cftemplates.codedeploy import CodeDeploy
-from paco.cftemplates.codebuild import CodeBuild
-from paco.cftemplates.codepipeline import CodePipeline
-from paco.cftemplates.route53 import Route53
-from paco.cftemplates.ec2 import EC2
-from paco.cftemplates.nat_gateway import NATGateway
-from paco.cftemplates.kms import KMS
-from paco.cftemplates.cw_alarms import CWAlarms
-from paco.cftemplates.lambda_function import Lambda
-from paco.cftemplates.account import Account
-from paco.cftemplates.eventsrule import EventsRule
-from paco.cftemplates.snstopics import SNSTopics
-from paco.cftemplates.loggroups import LogGroups
-from paco.cftemplates.cloudtrail import CloudTrail
-from paco.cftemplates.cloudfront import CloudFront
-from paco.cftemplates.rds import RDS, DBParameterGroup
-from paco.cftemplates.elasticache import ElastiCache
-from paco.cftemplates.vpc_peering import VPCPeering
-from paco.cftemplates.apigateway import ApiGatewayRestApi
-from paco.cftemplates.iam_users import IAMUsers
-from paco.cftemplates.iam_user_account_delegates import IAMUserAccountDelegates
-from paco.cftemplates.efs import EFS
-from paco.cftemplates.eip import EIP
-from paco.cftemplates.route53healthcheck import Route53HealthCheck
-from paco.cftemplates.route53_hostedzone import Route53HostedZone
-from paco.cftemplates.route53_recordset import Route53RecordSet
-from paco.cftemplates.secrets_manager import SecretsManager
-from paco.cftemplates.ebs import EBS
-from paco.cftemplates.codedeployapplication import CodeDeployApplication
-from paco.cftemplates.backup import BackupVault
-from paco.cftemplates.dashboard import CloudWatchDashboard
-from paco.cftemplates.elasticsearch import ElasticsearchDomain
+"""
+CloudFormation templates. Template modules are imported when a template class is first used.
+"""
+
+import importlib
+import sys
+
+# Class name: module that it is imported from
+lazy_imports = {
+    'CFTemplate': 'cftemplates',
+    'VPC': 'vpc',
+    'Segment': 'segment',
+    'SecurityGroups': 'security_groups',
+    'ELB': 'elb',
+    'ALB': 'alb',
+    'ASG': 'asg',
+    'IAMManagedPolicies': 'iam_managed_policies',
+    'IAMRoles': 'iam_roles',
+    'IAMSLRoles': 'iam_sl_roles',
+    'S3': 's3',
+    'CodeCommit': 'codecommit',
+    'CodeDeploy': 'codedeploy',
+    'CodeBuild': 'codebuild',
+    'CodePipeline': 'codepipeline',
+    'Route53': 'route53',
+    'EC2': 'ec2',
+    'NATGateway': 'nat_gateway',
+    'KMS': 'kms',
+    'CWAlarms': 'cw_alarms',
+    'Lambda': 'lambda_function',
+    'Account': 'account',
+    'EventsRule': 'eventsrule',
+    'SNSTopics': 'snstopics',
+    'LogGroups': 'loggroups',
+    'CloudTrail': 'cloudtrail',
+    'CloudFront': 'cloudfront',
+    'RDS': 'rds',
+    'DBParameterGroup': 'rds',
+    'ElastiCache': 'elasticache',
+    'VPCPeering': 'vpc_peering',
+    'ApiGatewayRestApi': 'apigateway',
+    'IAMUsers': 'iam_users',
+    'IAMUserAccountDelegates': 'iam_user_account_delegates',
+    'EFS': 'efs',
+    'EIP': 'eip',
+    'Route53HealthCheck': 'route53healthcheck',
+    'Route53HostedZone': 'route53_hostedzone',
+    'Route53RecordSet': 'route53_recordset',
+    'SecretsManager': 'secrets_manager',
+    'EBS': 'ebs',
+    'CodeDeployApplication': 'codedeployapplication',
+    'BackupVault': 'backup',
+    'CloudWatchDashboard': 'dashboard',
+    'ElasticsearchDomain': 'elasticsearch',
+}
+
+def __getattr__(name):
+    "Import modules the first time one of their classes is used"
+    if name not in lazy_imports:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(__name__ + '.' + lazy_imports[name]), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(lazy_imports.keys()))
+
+if sys.version_info < (3, 7):
+    # Module __getattr__ requires Python 3.7
+    for name in lazy_imports.keys():
+        __getattr__(name)
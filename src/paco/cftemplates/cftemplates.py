@@ -1,12 +1,16 @@
 from botocore.exceptions import ClientError
 from enum import Enum
 from paco import utils
-from paco.core.yaml import YAML
+from paco.core.yaml import load_cfn_template
+from paco.core.diff import diff_documents
 from paco.core.exception import StackException, PacoErrorCode, PacoException
+from paco.cftemplates.paco_sub import paco_sub
+from paco.cftemplates.render import get_template_renderer
 from paco.models import references
 from paco.models.references import Reference
 from paco.stack_group import Stack, StackOrder
-from paco.utils import dict_of_dicts_merge, md5sum, big_join, list_to_comma_string
+from paco.stack_group.cfn_client import get_cfn_client, get_validate_semaphore
+from paco.utils import dict_of_dicts_merge, md5sum, big_join, list_to_comma_string, write_if_changed
 from pprint import pprint
 from shutil import copyfile
 import base64
@@ -16,9 +20,7 @@ import random, re
 import string, sys
 import troposphere
 
-# deepdiff turns on Deprecation warnings, we need to turn them back off
-# again right after import, otherwise 3rd libs spam dep warnings all over the place
-from deepdiff import DeepDiff
+# 3rd party libs spam dep warnings all over the place
 import warnings
 warnings.simplefilter("ignore")
 
@@ -64,14 +66,22 @@ class StackOutputParam():
         }
         self.entry_list.append(entry)
 
-    def gen_parameter_value(self):
+    def gen_parameter_value(self, local=False):
+        """
+        Output values are looked up from the stacks in AWS. If local is True, the
+        values saved locally when the stacks were last provisioned are used when available.
+        """
         param_value = ""
         comma = ''
         for entry in self.entry_list:
             for output_key in entry['output_keys']:
-                output_value = entry['stack'].get_outputs_value(
-                    output_key
-                )
+                output_value = None
+                if local == True:
+                    output_value = entry['stack'].get_local_outputs_value(output_key)
+                if output_value == None:
+                    output_value = entry['stack'].get_outputs_value(
+                        output_key
+                    )
                 param_value += comma + output_value
                 comma = ','
 
@@ -145,7 +155,7 @@ class Parameter():
         self.resolved_value = resolved_value
         self.ignore_changes = ignore_changes
 
-    def gen_parameter_value(self):
+    def gen_parameter_value(self, local=False):
         return self.value
 
     def gen_parameter(self):
@@ -213,10 +223,25 @@ class CFTemplate():
             self.update_only = False
         self._enabled = value
 
+    @property
+    def body(self):
+        "The YAML template body, waiting for it to finish rendering if needed"
+        if self.rendered_body != None:
+            self._body = self.rendered_body.result()
+            self.rendered_body = None
+        return self._body
+
+    @body.setter
+    def body(self, value):
+        self.rendered_body = None
+        self._body = value
+        # set by generate_template() once the body has been substituted
+        self.body_md5 = None
+
     @property
     def cfn_client(self):
         if hasattr(self, '_cfn_client') == False:
-            self._cfn_client = self.account_ctx.get_aws_client('cloudformation', self.aws_region)
+            self._cfn_client = get_cfn_client(self.account_ctx, self.aws_region)
         return self._cfn_client
 
     def init_template(self, description):
@@ -279,81 +304,28 @@ class CFTemplate():
 
         return yaml_path
 
-    # Move this somewhere else?
+    def resolve_sub_ref(self, sub_ref):
+        "Resolve a paco.ref from a paco.sub expression"
+        if sub_ref.find('<account>') != -1:
+            sub_ref = sub_ref.replace('<account>', self.account_ctx.get_name())
+        if sub_ref.find('<environment>') != -1:
+            sub_ref = sub_ref.replace('<environment>', self.environment_name)
+        if sub_ref.find('<region>') != -1:
+            sub_ref = sub_ref.replace('<region>', self.aws_region)
+        return self.paco_ctx.get_ref(sub_ref)
+
     def paco_sub(self):
-        #print("Start sub")
-        while True:
-            # Isolate string between quotes: paco.sub ''
-            sub_idx = self.body.find('paco.sub')
-            if sub_idx == -1:
-                #print("break 1")
-                break
-            #print("Found a sub: " + self.body[sub_idx:sub_idx+128])
-            # print(self.body)
-            end_idx = self.body.find('\n', sub_idx)
-            if end_idx == -1:
-                end_idx = len(self.body)
-            str_idx = self.body.find("'", sub_idx, end_idx)
-            if str_idx == -1:
-                raise StackException(PacoErrorCode.Unknown, message="paco.sub error")
-            str_idx += 1
-            end_str_idx = self.body.find("'", str_idx, end_idx)
-            if end_str_idx == -1:
-                raise StackException(PacoErrorCode.Unknown, message = "paco.sub error")
-            #print("Paco SUB: %s" % (self.body[str_idx:str_idx+(end_str_idx-str_idx)]))
-            # Isolate any ${} replacements
-            first_pass = True
-            while True:
-                dollar_idx = self.body.find("${", str_idx, end_str_idx)
-                if dollar_idx == -1:
-                    if first_pass == True:
-                        message = 'Unable to find paco.ref in paco.sub expression.\n'
-                        message += 'Stack: {}\n'.format(self.stack.get_name())
-                        message += "paco.sub '{}'\n".format(self.body[str_idx:end_str_idx])
-                        raise StackException(PacoErrorCode.Unknown, message = message)
-                    else:
-                        #print("break 2")
-                        break
-                rep_1_idx = dollar_idx
-                rep_2_idx = self.body.find("}", rep_1_idx, end_str_idx)+1
-                next_ref_idx = self.body.find("paco.ref ", rep_1_idx, rep_2_idx)
-                if next_ref_idx != -1:
-                    sub_ref_idx = next_ref_idx
-                    sub_ref = self.body[sub_ref_idx:sub_ref_idx+(rep_2_idx-sub_ref_idx-1)]
-                    #print("Sub ref: " + sub_ref)
-                    if sub_ref.find('<account>') != -1:
-                        sub_ref = sub_ref.replace('<account>', self.account_ctx.get_name())
-                    if sub_ref.find('<environment>') != -1:
-                        sub_ref = sub_ref.replace('<environment>', self.environment_name)
-                    if sub_ref.find('<region>') != -1:
-                        sub_ref = sub_ref.replace('<region>', self.aws_region)
-
-                    sub_value = self.paco_ctx.get_ref(sub_ref)
-                    if sub_value == None:
-                        raise StackException(
-                            PacoErrorCode.Unknown,
-                            message="cftemplate: paco_sub: Unable to locate value for ref: " + sub_ref
-                        )
-                    #print("Sub Value: %s" % (sub_value))
-                    # Replace the ${}
-                    sub_var = self.body[rep_1_idx:rep_1_idx+(rep_2_idx-rep_1_idx)]
-                    #print("Sub var: %s" % (sub_var))
-                    self.body = self.body.replace(sub_var, sub_value, 1)
-                else:
-                    #print("break 3")
-                    break
-                first_pass = False
-
-            # Remote paco.sub '' scaffolding
-            self.body = self.body[:sub_idx] + self.body[str_idx:]
-            end_idx = self.body.find('\n', sub_idx)
-            end_str_idx = self.body.find("'", sub_idx, end_idx)
-            self.body = self.body[:end_str_idx] + self.body[end_str_idx+1:]
-            #print("break 4")
-            #break
-        #print("End sub")
-
-    def validate(self):
+        "Substitute the paco.sub expressions in the template body"
+        stack_name = None
+        if self.stack != None:
+            stack_name = self.stack.get_name()
+        self.body = paco_sub(self.body, self.resolve_sub_ref, stack_name)
+
+    def validate(self, confirm_changes=True):
+        """
+        Validate the template and confirm changes to the applied template. If confirm_changes is False,
+        changes are returned as a diff so that they can be confirmed later.
+        """
         applied_file_path, new_file_path = self.init_template_store_paths()
         short_yaml_path = str(new_file_path).replace(self.paco_ctx.home, '')
         if short_yaml_path[0] == '/':
@@ -371,8 +343,22 @@ class CFTemplate():
         if applied_file_path.exists() == False:
             new_str = ':new'
         self.paco_ctx.log_action_col("Validate", self.account_ctx.get_name(), "Template"+new_str, short_yaml_path)
+        self.validate_template()
+        #self.paco_ctx.log("Validation successful")
+        if confirm_changes == False:
+            return self.get_template_changes()
+        self.validate_template_changes()
+
+    def validate_template(self):
+        """Validate the template body with CloudFormation. Bodies that have already
+        passed validation are not validated again."""
+        store = self.stack.store
+        if store.is_template_validated(self.body, self.aws_region):
+            return
         try:
-            self.cfn_client.validate_template(TemplateBody=self.body)
+            with get_validate_semaphore(self.account_ctx, self.aws_region):
+                self.cfn_client.validate_template(TemplateBody=self.body)
+            store.set_template_validated(self.body, self.aws_region)
         except ClientError as e:
             if e.response['Error']['Code'] == 'ValidationError':
                 message = "Validation Error: {}\nStack: {}\nTemplate: {}\n".format(
@@ -381,8 +367,6 @@ class CFTemplate():
                     self.get_yaml_path()
                 )
                 raise StackException(PacoErrorCode.TemplateValidationError, message=message)
-        #self.paco_ctx.log("Validation successful")
-        self.validate_template_changes()
 
     def provision(self):
         #print("cftemplate: provision: " + self.get_yaml_path())
@@ -414,21 +398,20 @@ class CFTemplate():
         pass
 
     def generate_template(self):
-        "Write template to the filesystem"
+        """Substitute the template body and write it to the build folder. The file is only
+        written if it has changed."""
         self.paco_sub()
-        # Create folder and write template body to file
+        body_bytes = self.body.encode('utf-8')
+        self.body_md5 = md5sum(str_data=self.body)
         pathlib.Path(self.build_folder).mkdir(parents=True, exist_ok=True)
-        stream = open(self.get_yaml_path(), 'w')
-        stream.write(self.body)
-        stream.close()
+        write_if_changed(self.get_yaml_path(), body_bytes)
 
-        yaml_path = pathlib.Path(self.get_yaml_path())
         # Template size limit is 51,200 bytes
         # Start warning if the template size gets close
         warning_size_limite_bytes = 41200
-        if yaml_path.stat().st_size >= warning_size_limite_bytes:
-            print("WARNING: Template is reaching size limit of 51,200 bytes: Current size: {} bytes ".format(yaml_path.stat().st_size))
-            print("template: " + yaml_path)
+        if len(body_bytes) >= warning_size_limite_bytes:
+            print("WARNING: Template is reaching size limit of 51,200 bytes: Current size: {} bytes ".format(len(body_bytes)))
+            print("template: " + self.get_yaml_path())
 
 
     def init_applied_parameters_path(self, applied_template_path):
@@ -436,11 +419,7 @@ class CFTemplate():
 
     def apply_stack_parameters(self):
         parameter_list = self.generate_stack_parameters()
-        applied_template_path, _ = self.init_template_store_paths()
-        applied_param_file_path = self.init_applied_parameters_path(applied_template_path)
-        yaml = YAML(pure=True)
-        with open(applied_param_file_path, 'w') as stream:
-            yaml.dump(parameter_list, stream)
+        self.stack.store.set_parameters(self.stack.store_key, parameter_list)
 
     def confirm_stack_parameter_changes(self, parameter_list):
         """
@@ -449,14 +428,13 @@ class CFTemplate():
         if self.paco_ctx.disable_validation == True:
             return
         applied_file_path, new_file_path = self.init_template_store_paths()
-        param_applied_file_path = applied_file_path.with_suffix('.parameters')
-
-        if param_applied_file_path.exists() == False:
+        param_applied_file_path = self.init_applied_parameters_path(applied_file_path)
+        applied_parameter_list = self.stack.store.get_parameters(
+            self.stack.store_key,
+            legacy_path=param_applied_file_path
+        )
+        if applied_parameter_list == None:
             return
-        yaml = YAML(pure=True)
-        yaml.allow_duplicate_keys = True
-        with open(param_applied_file_path, 'r') as stream:
-            applied_parameter_list = yaml.load(stream)
 
         # Detect changes. Ignore changes where ignore_updates is True
         unchanged = True
@@ -479,7 +457,7 @@ class CFTemplate():
             print("Model: {}".format(self.config_ref))
             print("Template:  {}".format(new_file_path))
             print("Applied template:  {}".format(applied_file_path))
-            print("Applied parameters:  {}".format(param_applied_file_path))
+            print("Applied parameters:  {}".format(self.stack.store.path))
         print('')
 
         col_3_size = 0
@@ -697,15 +675,19 @@ class CFTemplate():
                 param_list.append(value)
             self.set_parameter(param_name, ','.join(param_list))
 
-    def gen_cache_id(self):
-        "Create and return an MD5 cache id of the template"
-        yaml_path = pathlib.Path(self.get_yaml_path())
-        if yaml_path.exists() == False:
-            return None
-        template_md5 = md5sum(self.get_yaml_path())
+    def gen_cache_id(self, local=False):
+        """Create and return an MD5 cache id of the template.
+        If local is True, stack output values saved locally are used for Parameters."""
+        if self.body_md5 != None:
+            template_md5 = self.body_md5
+        else:
+            yaml_path = pathlib.Path(self.get_yaml_path())
+            if yaml_path.exists() == False:
+                return None
+            template_md5 = md5sum(self.get_yaml_path())
         outputs_str = ""
         for param_entry in self.parameters:
-            param_value = param_entry.gen_parameter_value()
+            param_value = param_entry.gen_parameter_value(local=local)
             outputs_str += param_value
 
         outputs_md5 = md5sum(str_data=outputs_str)
@@ -717,7 +699,8 @@ class CFTemplate():
         """Sets the template and if there is not already a stack_group,
         creates a Stack and adds it to the stack_group."""
         if template_body == None:
-            self.body = self.template.to_yaml()
+            # rendered in the background, self.body waits for the result
+            self.rendered_body = get_template_renderer().render(self.template)
         else:
             self.body = template_body
         if self.stack_group != None:
@@ -1198,7 +1181,9 @@ class CFTemplate():
 
     def apply_template_changes(self):
         applied_file_path, new_file_path = self.init_template_store_paths()
-        if new_file_path.exists():
+        if self.body_md5 != None:
+            write_if_changed(applied_file_path, self.body.encode('utf-8'))
+        elif new_file_path.exists():
             copyfile(new_file_path, applied_file_path)
 
     def warn_template_changes(self, deep_diff):
@@ -1212,32 +1197,44 @@ class CFTemplate():
 
 
     def validate_template_changes(self):
-        if self.paco_ctx.disable_validation == True:
+        deep_diff = self.get_template_changes()
+        if deep_diff == None:
             return
+        self.confirm_template_changes(deep_diff)
+
+    def get_template_changes(self):
+        """
+        Returns the changes between the applied template and the new template in the same form as a
+        tree view DeepDiff, or None if there are no changes to confirm. Templates are only loaded
+        and compared if the applied template is not identical to the new one.
+        """
+        if self.paco_ctx.disable_validation == True:
+            return None
         elif self.enabled == False:
-            return
+            return None
         elif self.change_protected == True:
-            return
+            return None
         applied_file_path, new_file_path = self.init_template_store_paths()
         if applied_file_path.exists() == False:
-            return
-
-        yaml = YAML(pure=True)
-        yaml.allow_duplicate_keys = True
-        #yaml.default_flow_sytle = False
+            return None
+        if self.body_md5 != None:
+            new_body = self.body
+        else:
+            with open(new_file_path, 'r') as stream:
+                new_body = stream.read()
         with open(applied_file_path, 'r') as stream:
-            applied_file_dict= yaml.load(stream)
-        with open(new_file_path, 'r') as stream:
-            new_file_dict= yaml.load(stream)
-
-        deep_diff = DeepDiff(
-            applied_file_dict,
-            new_file_dict,
-            verbose_level=1,
-            view='tree'
-        )
+            applied_body = stream.read()
+        if applied_body == new_body:
+            return None
+
+        deep_diff = diff_documents(load_cfn_template(applied_body), load_cfn_template(new_body))
         if len(deep_diff.keys()) == 0:
-            return
+            return None
+        return deep_diff
+
+    def confirm_template_changes(self, deep_diff):
+        "Display template changes and confirm them"
+        applied_file_path, new_file_path = self.init_template_store_paths()
         print("--------------------------------------------------------")
         print("Confirm template changes to CloudFormation Stack: " + self.stack.get_name())
         print()
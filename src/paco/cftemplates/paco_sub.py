@@ -0,0 +1,67 @@
+"""
+Substitution of paco.sub expressions in CloudFormation template bodies.
+
+A paco.sub expression is a single quoted string on one line that contains one or more
+${paco.ref ...} references, for example:
+
+    paco.sub 'arn:aws:iam::${paco.ref accounts.master}:root'
+
+The scaffolding is removed and each reference is replaced by it's value:
+
+    arn:aws:iam::123456789012:root
+
+Any other ${} variables are left for CloudFormation.
+"""
+
+import re
+from paco.core.exception import StackException, PacoErrorCode
+
+
+# paco.sub followed by a quoted string on the same line. The string group is None if the
+# quotes are missing or are not closed on that line.
+PACO_SUB_RE = re.compile(r"paco\.sub[^'\n]*(?:'([^'\n]*)')?")
+VARIABLE_RE = re.compile(r"\$\{([^}]*)\}")
+
+
+def paco_sub(body, resolve_ref, stack_name=None):
+    """
+    Returns the body with every paco.sub expression substituted. The body is scanned once
+    and resolve_ref(ref) is called once for each distinct paco.ref.
+    """
+    parts = []
+    values = {}
+    pos = 0
+    for sub_match in PACO_SUB_RE.finditer(body):
+        expression = sub_match.group(1)
+        if expression == None:
+            raise StackException(PacoErrorCode.Unknown, message="paco.sub error")
+        parts.append(body[pos:sub_match.start()])
+        found_variable = False
+        expression_pos = 0
+        for variable_match in VARIABLE_RE.finditer(expression):
+            found_variable = True
+            ref_idx = variable_match.group(1).find('paco.ref ')
+            if ref_idx == -1:
+                continue
+            sub_ref = variable_match.group(1)[ref_idx:]
+            if sub_ref not in values:
+                sub_value = resolve_ref(sub_ref)
+                if sub_value == None:
+                    raise StackException(
+                        PacoErrorCode.Unknown,
+                        message="cftemplate: paco_sub: Unable to locate value for ref: " + sub_ref
+                    )
+                values[sub_ref] = str(sub_value)
+            parts.append(expression[expression_pos:variable_match.start()])
+            parts.append(values[sub_ref])
+            expression_pos = variable_match.end()
+        if found_variable == False:
+            message = 'Unable to find paco.ref in paco.sub expression.\n'
+            if stack_name != None:
+                message += 'Stack: {}\n'.format(stack_name)
+            message += "paco.sub '{}'\n".format(expression)
+            raise StackException(PacoErrorCode.Unknown, message=message)
+        parts.append(expression[expression_pos:])
+        pos = sub_match.end()
+    parts.append(body[pos:])
+    return ''.join(parts)
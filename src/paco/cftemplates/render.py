@@ -0,0 +1,90 @@
+"""
+Renders troposphere templates to YAML in a pool of processes.
+"""
+
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+
+def json_to_yaml(template_json):
+    "Convert a template from JSON to YAML the same way as troposphere's Template.to_yaml()"
+    import cfn_flip
+    return cfn_flip.to_yaml(template_json, clean_up=False, long_form=False)
+
+
+class RenderedBody():
+    "A template body that is being converted to YAML"
+
+    def __init__(self, renderer, template_json, future=None):
+        self.renderer = renderer
+        self.template_json = template_json
+        self.future = future
+
+    def result(self):
+        "Blocks until the YAML body is ready and returns it"
+        if self.future != None:
+            try:
+                return self.future.result()
+            except BrokenProcessPool:
+                self.renderer.pool_broken = True
+        return json_to_yaml(self.template_json)
+
+
+class TemplateRenderer():
+    """
+    troposphere's Template.to_yaml() is a to_json() followed by a conversion from JSON to YAML with
+    cfn_flip. The conversion is pure Python and takes most of the time, so the JSON is made where
+    the template is built and the conversion is done in a pool of processes while the next templates
+    are built. Templates are converted in-process if there is a single CPU or the pool can not be used.
+    """
+
+    def __init__(self, max_processes=None):
+        if max_processes == None:
+            max_processes = os.cpu_count() or 1
+        self.max_processes = max_processes
+        self.lock = threading.Lock()
+        self.pool = None
+        self.pool_broken = False
+
+    def get_pool(self):
+        with self.lock:
+            if self.pool == None and self.pool_broken == False and self.max_processes > 1:
+                try:
+                    # spawn, as forking a process with running threads is not safe
+                    self.pool = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=self.max_processes,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+                except (OSError, ValueError, NotImplementedError):
+                    self.pool_broken = True
+            if self.pool_broken == True:
+                return None
+            return self.pool
+
+    def render(self, template):
+        "Start rendering a troposphere Template and return a RenderedBody"
+        template_json = template.to_json()
+        pool = self.get_pool()
+        if pool == None:
+            return RenderedBody(self, template_json)
+        try:
+            future = pool.submit(json_to_yaml, template_json)
+        except (BrokenProcessPool, RuntimeError):
+            self.pool_broken = True
+            return RenderedBody(self, template_json)
+        return RenderedBody(self, template_json, future)
+
+
+template_renderer = None
+template_renderer_lock = threading.Lock()
+
+def get_template_renderer():
+    "Returns the TemplateRenderer shared by every template"
+    global template_renderer
+    with template_renderer_lock:
+        if template_renderer == None:
+            template_renderer = TemplateRenderer()
+        return template_renderer
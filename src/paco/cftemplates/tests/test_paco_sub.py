@@ -0,0 +1,73 @@
+import os
+import pytest
+import time
+from paco.cftemplates.paco_sub import paco_sub
+from paco.core.exception import StackException
+
+
+# timing assertions only run when PACO_BENCHMARK is set
+run_benchmarks = os.environ.get('PACO_BENCHMARK', None) != None
+
+def resolve_ref(ref):
+    return ref.replace('paco.ref ', '').replace('.', '-')
+
+def large_template(statements):
+    "A template body shaped like a large generated IAM or CodePipeline template"
+    lines = ['AWSTemplateFormatVersion: 2010-09-09', 'Resources:']
+    for i in range(statements):
+        lines.append("  Role{}:".format(i))
+        lines.append("    Type: AWS::IAM::Role")
+        lines.append("    Properties:")
+        lines.append("      Principal:")
+        lines.append("        - paco.sub 'arn:aws:iam::${{paco.ref accounts.account{}}}:root'".format(i % 10))
+        lines.append("      Resource:")
+        lines.append("        - paco.sub 'arn:aws:s3:::${{paco.ref netenv.app.bucket{}.name}}/${{AWS::Region}}/*'".format(i))
+        lines.append("        - !Sub 'arn:aws:logs:${AWS::Region}:${AWS::AccountId}:*'")
+    return '\n'.join(lines) + '\n'
+
+
+def test_paco_sub():
+    body = "Principal:\n  - paco.sub 'arn:aws:iam::${paco.ref accounts.master}:root'\n"
+    assert paco_sub(body, resolve_ref) == "Principal:\n  - arn:aws:iam::accounts-master:root\n"
+
+def test_paco_sub_multiple_refs():
+    body = "A: paco.sub '${paco.ref a.b}-${AWS::Region}-${paco.ref c.d}'\nB: paco.sub '${paco.ref a.b}'"
+    assert paco_sub(body, resolve_ref) == "A: a-b-${AWS::Region}-c-d\nB: a-b"
+
+def test_paco_sub_resolves_each_ref_once():
+    resolved = []
+    def counting_resolve_ref(ref):
+        resolved.append(ref)
+        return resolve_ref(ref)
+    paco_sub(large_template(100), counting_resolve_ref)
+    assert len(resolved) == len(set(resolved)) == 110
+
+def test_paco_sub_errors():
+    with pytest.raises(StackException):
+        paco_sub("A: paco.sub 'no references'", resolve_ref)
+    with pytest.raises(StackException):
+        paco_sub("A: paco.sub 'not closed\n'", resolve_ref)
+    with pytest.raises(StackException):
+        paco_sub("A: paco.sub '${paco.ref a.b}'", lambda ref: None)
+
+def test_paco_sub_large_template():
+    body = paco_sub(large_template(1000), resolve_ref)
+    assert 'paco.' not in body
+    assert "        - arn:aws:iam::accounts-account7:root\n" in body
+    assert "        - arn:aws:s3:::netenv-app-bucket999-name/${AWS::Region}/*\n" in body
+    assert body.count("!Sub 'arn:aws:logs:${AWS::Region}:${AWS::AccountId}:*'") == 1000
+
+@pytest.mark.skipif(run_benchmarks == False, reason="PACO_BENCHMARK is not set")
+def test_paco_sub_benchmark():
+    "Substitution time grows linearly with the size of the template"
+    def best_time(body):
+        timings = []
+        for i in range(3):
+            start = time.perf_counter()
+            paco_sub(body, resolve_ref)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+    small = best_time(large_template(500))
+    large = best_time(large_template(4000))
+    # 8x the statements, allow for timer noise but not quadratic growth
+    assert large < small * 24, "small: {:.4f}s large: {:.4f}s".format(small, large)
@@ -0,0 +1,34 @@
+import json
+import pytest
+from paco.cftemplates.render import TemplateRenderer, json_to_yaml
+
+cfn_flip = pytest.importorskip('cfn_flip')
+
+
+class JSONTemplate():
+    "Stands in for a troposphere Template"
+    def __init__(self, resource_count):
+        self.resource_count = resource_count
+
+    def to_json(self):
+        resources = {}
+        for i in range(self.resource_count):
+            resources['Topic{}'.format(i)] = {
+                'Type': 'AWS::SNS::Topic',
+                'Properties': {'TopicName': {'Fn::Sub': 'topic-{}-${{AWS::Region}}'.format(i)}},
+            }
+        return json.dumps({'Resources': resources}, indent=1, sort_keys=True)
+
+
+def test_render_in_pool():
+    renderer = TemplateRenderer(max_processes=2)
+    templates = [JSONTemplate(count) for count in range(1, 20)]
+    rendered_bodies = [renderer.render(template) for template in templates]
+    for template, rendered_body in zip(templates, rendered_bodies):
+        assert rendered_body.result() == json_to_yaml(template.to_json())
+
+def test_render_in_process():
+    renderer = TemplateRenderer(max_processes=1)
+    rendered_body = renderer.render(JSONTemplate(3))
+    assert rendered_body.future == None
+    assert "!Sub 'topic-2-${AWS::Region}'" in rendered_body.result()
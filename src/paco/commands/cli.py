@@ -1,27 +1,81 @@
 import click
-import pkg_resources
-from paco.commands.cmd_provision import provision_command
-from paco.commands.cmd_init import init_group
-from paco.commands.cmd_delete import delete_command
-from paco.commands.cmd_describe import describe_command
-from paco.commands.cmd_validate import validate_command
-from paco.commands.cmd_shell import shell_command
+import importlib
 from paco.commands.helpers import pass_paco_context
 
 
-@click.group()
-@click.version_option(
-    version=pkg_resources.require("paco-cloud")[0].version,
-    prog_name="Paco: Prescribed automation for cloud orchestration"
+class LazyGroup(click.Group):
+    """
+    A click Group whose command modules are only imported when a command is run,
+    so that 'paco --help' does not import every command and their dependencies.
+    The help for the group lists each command with a short help string that is
+    kept with the group, as getting it from the command would import it's module.
+    """
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # command name: (module name, command attribute name, short help)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx):
+        return sorted(list(self.commands.keys()) + list(self.lazy_commands.keys()))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_commands and cmd_name not in self.commands:
+            module_name, attr_name, short_help = self.lazy_commands[cmd_name]
+            command = getattr(importlib.import_module(module_name), attr_name)
+            self.add_command(command, cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx, formatter):
+        "Lists the commands without importing the ones that have not been loaded"
+        cmd_names = self.list_commands(ctx)
+        if len(cmd_names) == 0:
+            return
+        limit = formatter.width - 6 - max(len(cmd_name) for cmd_name in cmd_names)
+        rows = []
+        for cmd_name in cmd_names:
+            if cmd_name in self.commands:
+                command = self.commands[cmd_name]
+                if command.hidden:
+                    continue
+                rows.append((cmd_name, command.get_short_help_str(limit)))
+            else:
+                rows.append((cmd_name, self.lazy_commands[cmd_name][2]))
+        if len(rows) > 0:
+            with formatter.section('Commands'):
+                formatter.write_dl(rows)
+
+
+def print_version(ctx, param, value):
+    if not value or ctx.resilient_parsing:
+        return
+    import pkg_resources
+    click.echo("Paco: Prescribed automation for cloud orchestration, version {}".format(
+        pkg_resources.require("paco-cloud")[0].version
+    ))
+    ctx.exit()
+
+
+@click.group(
+    cls=LazyGroup,
+    lazy_commands={
+        'init': ('paco.commands.cmd_init', 'init_group', 'Commands for initializing Paco projects.'),
+        'validate': ('paco.commands.cmd_validate', 'validate_command', 'Validate a Paco project'),
+        'provision': ('paco.commands.cmd_provision', 'provision_command', 'Provision resources to the cloud.'),
+        'delete': ('paco.commands.cmd_delete', 'delete_command', 'Delete Paco managed resources'),
+        #'describe': ('paco.commands.cmd_describe', 'describe_command', 'Describe a Paco project'),
+        #'shell': ('paco.commands.cmd_shell', 'shell_command', 'Open a shell to an instance.'),
+    }
+)
+@click.option(
+    '--version',
+    is_flag=True,
+    callback=print_version,
+    expose_value=False,
+    is_eager=True,
+    help='Show the version and exit.'
 )
 @pass_paco_context
 def cli(ctx):
     """Paco: Prescribed automation for cloud orchestration"""
     pass
-
-cli.add_command(init_group)
-cli.add_command(validate_command)
-cli.add_command(provision_command)
-cli.add_command(delete_command)
-#cli.add_command(describe_command)
-#cli.add_command(shell_command)
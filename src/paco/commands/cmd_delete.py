@@ -1,4 +1,3 @@
-import paco.models
 import click
 import sys
 from paco.commands.helpers import (
@@ -18,9 +17,12 @@ def delete_command(
     paco_ctx,
     verbose,
     nocache,
+    refresh,
     yes,
     disable_validation,
     quiet_changes_only,
+    max_workers,
+    parallel_regions,
     config_scope,
     home='.'
 ):
@@ -31,9 +33,12 @@ def delete_command(
         paco_ctx,
         verbose,
         nocache,
+        refresh,
         yes,
         disable_validation,
         quiet_changes_only,
+        max_workers,
+        parallel_regions,
         config_scope,
         home
     )
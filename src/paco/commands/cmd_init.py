@@ -4,22 +4,8 @@ import os.path
 import sys
 import paco.commands.helpers
 from paco.commands.helpers import pass_paco_context, paco_home_option, init_paco_home_option, handle_exceptions
-from cookiecutter.main import cookiecutter
-from jinja2.ext import Extension
 
 
-def env_override(value, key):
-    env_value = os.getenv(key, value)
-    if env_value:
-        return env_value
-    else:
-        return value
-
-class EnvOverrideExtension(Extension):
-    def __init__(self, environment):
-        super(EnvOverrideExtension, self).__init__(environment)
-        environment.filters['env_override'] = env_override
-
 def init_args(func):
     func = click.argument("ACTION", required=True, type=click.STRING)(func)
     return func
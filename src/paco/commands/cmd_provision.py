@@ -1,4 +1,3 @@
-import paco.models
 import click
 import sys
 from paco.commands.helpers import (
@@ -18,9 +17,12 @@ def provision_command(
     paco_ctx,
     verbose,
     nocache,
+    refresh,
     yes,
     disable_validation,
     quiet_changes_only,
+    max_workers,
+    parallel_regions,
     config_scope,
     home='.'
 ):
@@ -31,14 +33,19 @@ def provision_command(
         paco_ctx,
         verbose,
         nocache,
+        refresh,
         yes,
         disable_validation,
         quiet_changes_only,
+        max_workers,
+        parallel_regions,
         config_scope,
         home
     )
     controller = paco_ctx.get_controller(controller_type, command, obj)
     controller.provision()
+    paco_ctx.log_ref_cache_stats()
+    paco_ctx.log_aws_client_stats()
 
 provision_command.help = """
 Provision Cloud Resources.
@@ -17,9 +17,12 @@ def validate_command(
     paco_ctx,
     verbose,
     nocache,
+    refresh,
     yes,
     disable_validation,
     quiet_changes_only,
+    max_workers,
+    parallel_regions,
     config_scope,
     home='.'
 ):
@@ -30,14 +33,19 @@ def validate_command(
         paco_ctx,
         verbose,
         nocache,
+        refresh,
         yes,
         disable_validation,
         quiet_changes_only,
+        max_workers,
+        parallel_regions,
         config_scope,
         home
     )
     controller = paco_ctx.get_controller(controller_type, 'validate', obj)
     controller.validate()
+    paco_ctx.log_ref_cache_stats()
+    paco_ctx.log_aws_client_stats()
 
 validate_command.help = """
 Creates CloudFormation templates and validates they are well-formed.
@@ -0,0 +1,19 @@
+"""
+Jinja2 extensions used by the paco init cookiecutter templates
+"""
+
+import os
+from jinja2.ext import Extension
+
+
+def env_override(value, key):
+    env_value = os.getenv(key, value)
+    if env_value:
+        return env_value
+    else:
+        return value
+
+class EnvOverrideExtension(Extension):
+    def __init__(self, environment):
+        super(EnvOverrideExtension, self).__init__(environment)
+        environment.filters['env_override'] = env_override
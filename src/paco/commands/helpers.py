@@ -1,16 +1,20 @@
 import click
 import os
 import sys
-import ruamel.yaml.constructor
-from paco.config.paco_context import PacoContext, AccountContext
 from paco.core.exception import PacoException, StackException, InvalidPacoScope, PacoBaseException, InvalidPacoHome
-from paco.models.exceptions import InvalidPacoProjectFile, UnusedPacoProjectField, InvalidPacoReference
-from paco.models.references import get_model_obj_from_ref
-from boto3.exceptions import Boto3Error
-from botocore.exceptions import BotoCoreError, ClientError
 from functools import wraps
 
-pass_paco_context = click.make_pass_decorator(PacoContext, ensure=True)
+# paco.models, boto3 and the rest of Paco are imported when a command runs and not when
+# the CLI starts, so that the CLI can parse arguments and show help quickly.
+
+def pass_paco_context(func):
+    "Passes the PacoContext as the first argument, creating it if it does not exist yet"
+    @wraps(func)
+    def new_func(*args, **kwargs):
+        from paco.config.paco_context import PacoContext
+        ctx = click.get_current_context()
+        return ctx.invoke(func, ctx.ensure_object(PacoContext), *args, **kwargs)
+    return new_func
 
 config_types = """
 CONFIG_SCOPE must be a Paco reference to a Paco object. This will select
@@ -32,17 +36,23 @@ def init_cloud_command(
     paco_ctx,
     verbose,
     nocache,
+    refresh,
     yes,
     disable_validation,
     quiet_changes_only,
+    max_workers,
+    parallel_regions,
     config_scope,
     home
 ):
     paco_ctx.verbose = verbose
     paco_ctx.nocache = nocache
+    paco_ctx.refresh = refresh
     paco_ctx.yes = yes
     paco_ctx.disable_validation = disable_validation
     paco_ctx.quiet_changes_only = quiet_changes_only
+    paco_ctx.max_workers = max_workers
+    paco_ctx.parallel_regions = parallel_regions
     paco_ctx.command = command_name
     init_paco_home_option(paco_ctx, home)
     if not paco_ctx.home:
@@ -145,14 +155,16 @@ See the Paco CLI config scope docs at https://www.paco-cloud.io/en/latest//cli.h
 """
             )
 
-    import warnings
-    warnings.simplefilter("ignore")
-    paco_ctx.load_project()
-
     # resource.snstopics is an alias for resource.notificationgroups
     if config_scope.startswith('resource.snstopics'):
         config_scope = 'resource.notificationgroups' + config_scope[len('resource.snstopics'):]
 
+    # The accounts in the scope have their roles assumed while loading the project
+    paco_ctx.config_scope = config_scope
+    import warnings
+    warnings.simplefilter("ignore")
+    paco_ctx.load_project()
+
     scope_parts = config_scope.split('.')
     if scope_parts[0] == 'resource':
         controller_type = scope_parts[1]
@@ -161,6 +173,7 @@ See the Paco CLI config scope docs at https://www.paco-cloud.io/en/latest//cli.h
 
     # Locate a model object and summarize it
     paco_ref = 'paco.ref {}'.format(config_scope)
+    from paco.models.references import get_model_obj_from_ref
     obj = get_model_obj_from_ref(paco_ref, paco_ctx.project)
     print('Object selected to {}:'.format(command_name))
     print('  Name: {}'.format(
@@ -188,7 +201,13 @@ def cloud_options(func):
         '-n', '--nocache',
         is_flag=True,
         default=False,
-        help='Disables the Paco CloudFormation stack cache.'
+        help='Disables the Paco CloudFormation stack cache and clears the template validation cache.'
+    )(func)
+    func = click.option(
+        '-r', '--refresh',
+        is_flag=True,
+        default=False,
+        help='Checks the stack cache against stack outputs in AWS instead of locally saved outputs.'
     )(func)
     func = click.option(
         '-y', '--yes',
@@ -208,6 +227,19 @@ def cloud_options(func):
         default=False,
         help='Supresses Cache, Protected, and Disabled messages.'
     )(func)
+    func = click.option(
+        '-w', '--max-workers',
+        type=click.IntRange(min=1),
+        default=1,
+        show_default=True,
+        help='Maximum number of independent CloudFormation stacks to work on concurrently.'
+    )(func)
+    func = click.option(
+        '--parallel-regions',
+        is_flag=True,
+        default=False,
+        help='Works on each region of a NetworkEnvironment concurrently.'
+    )(func)
     return func
 
 def cloud_args(func):
@@ -239,6 +271,9 @@ def handle_exceptions(func):
     """
     @wraps(func)
     def decorated(*args, **kwargs):
+        from paco.models.exceptions import InvalidPacoProjectFile, UnusedPacoProjectField, InvalidPacoReference
+        from boto3.exceptions import Boto3Error
+        from botocore.exceptions import BotoCoreError, ClientError
         # return func(*args, **kwargs)
         try:
             # new Paco Error types will be caught here
@@ -0,0 +1,64 @@
+"""
+Checks that 'paco --help' does not import the command modules or their dependencies.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+# modules that should only be imported when a command runs
+HEAVY_MODULES = (
+    'boto3',
+    'botocore',
+    'troposphere',
+    'cookiecutter',
+    'jinja2',
+    'paco.models',
+    'paco.config.paco_context',
+    'paco.cftemplates.cftemplates',
+    'paco.commands.cmd_init',
+    'paco.commands.cmd_provision',
+)
+
+def run_python(code):
+    return subprocess.run(
+        [sys.executable, '-c', code],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1'),
+    )
+
+def test_help_does_not_import_heavy_modules():
+    result = run_python(
+        'import json, sys\n'
+        'from click.testing import CliRunner\n'
+        'from paco.commands.cli import cli\n'
+        'result = CliRunner().invoke(cli, ["--help"])\n'
+        'print(json.dumps({"exit_code": result.exit_code, "output": result.output, "modules": sorted(sys.modules.keys())}))\n'
+    )
+    assert result.returncode == 0, result.stderr
+    help_result = json.loads(result.stdout)
+    assert help_result['exit_code'] == 0, help_result['output']
+    for cmd_name in ('delete', 'init', 'provision', 'validate'):
+        assert cmd_name in help_result['output']
+    assert 'Provision resources to the cloud.' in help_result['output']
+    modules = set(help_result['modules'])
+    imported = [module_name for module_name in HEAVY_MODULES if module_name in modules]
+    assert imported == [], "paco --help imported {}".format(', '.join(imported))
+
+def test_command_lookup_imports_command():
+    result = run_python(
+        'import click, sys, paco.commands.cli as cli; '
+        'ctx = click.Context(cli.cli); '
+        'print(sorted(cli.cli.list_commands(ctx))); '
+        'print(cli.cli.get_command(ctx, "validate").name); '
+        'print("paco.commands.cmd_validate" in sys.modules)'
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines() == [
+        "['delete', 'init', 'provision', 'validate']",
+        'validate',
+        'True',
+    ]
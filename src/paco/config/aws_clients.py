@@ -0,0 +1,147 @@
+"""
+Creates the boto3 Sessions and clients used to connect to AWS.
+
+Every Session shares a single botocore data loader, so the JSON service models are only
+read from disk once no matter how many accounts or credentials are used. Clients are
+created with a Config tuned for concurrent provisioning.
+"""
+
+import boto3
+import botocore.credentials
+import botocore.loaders
+import botocore.session
+import threading
+from botocore.config import Config
+
+
+# Connections kept open to each endpoint, enough for every --max-workers thread
+max_pool_connections = 50
+
+default_client_config = Config(
+    max_pool_connections=max_pool_connections,
+    retries={'mode': 'adaptive', 'max_attempts': 10},
+)
+
+shared_loader = None
+shared_loader_lock = threading.Lock()
+
+# Clients created and reused from a ClientCache by service name
+client_stats = {}
+client_stats_lock = threading.Lock()
+
+
+def get_shared_loader():
+    "The botocore data loader shared by all Sessions"
+    global shared_loader
+    with shared_loader_lock:
+        if shared_loader == None:
+            shared_loader = botocore.loaders.create_loader()
+        return shared_loader
+
+
+class PacoCredentialProvider(botocore.credentials.CredentialProvider):
+    "Provides credentials that Paco has already loaded, ahead of the default provider chain"
+    METHOD = 'paco'
+    CANONICAL_NAME = 'Paco'
+
+    def __init__(self, credentials):
+        super().__init__()
+        self.credentials = credentials
+
+    def load(self):
+        return self.credentials
+
+
+def create_session(
+    aws_access_key_id=None,
+    aws_secret_access_key=None,
+    aws_session_token=None,
+    region_name=None,
+    credentials=None
+):
+    """
+    Returns a new boto3 Session that uses the shared data loader. A Session is not thread-safe,
+    create clients from it one at a time or use a ClientCache.
+
+    credentials can be botocore RefreshableCredentials, which the Session's clients share.
+    """
+    loader = get_shared_loader()
+    botocore_session = botocore.session.Session()
+    botocore_session.register_component('data_loader', loader)
+    if credentials != None:
+        resolver = botocore_session.get_component('credential_provider')
+        resolver.insert_before('env', PacoCredentialProvider(credentials))
+    with shared_loader_lock:
+        session = boto3.Session(
+            aws_access_key_id=aws_access_key_id,
+            aws_secret_access_key=aws_secret_access_key,
+            aws_session_token=aws_session_token,
+            region_name=region_name,
+            botocore_session=botocore_session,
+        )
+        # boto3 adds it's resource models to the search paths of each new Session's loader
+        search_paths = loader.search_paths
+        search_paths[:] = list(dict.fromkeys(search_paths))
+    return session
+
+def get_client_config(client_config=None):
+    "The default client Config, with any settings from client_config taking precedence"
+    if client_config == None:
+        return default_client_config
+    return default_client_config.merge(client_config)
+
+def record_client(service_name, reused):
+    with client_stats_lock:
+        if service_name not in client_stats:
+            client_stats[service_name] = {'created': 0, 'reused': 0}
+        if reused == True:
+            client_stats[service_name]['reused'] += 1
+        else:
+            client_stats[service_name]['created'] += 1
+
+def get_client_stats():
+    "Returns a copy of the created and reused client counts by service name"
+    with client_stats_lock:
+        return {name: dict(stats) for name, stats in client_stats.items()}
+
+
+class ClientCache():
+    "Thread-safe cache of the clients and resources created from an account's Session"
+
+    def __init__(self, get_session):
+        # get_session(force) returns the boto3 Session to create clients from
+        self.get_session = get_session
+        self.clients = {}
+        self.resources = {}
+        self.lock = threading.RLock()
+
+    def get_client(self, service_name, region_name=None, client_config=None, force=False):
+        cache_id = (service_name, region_name)
+        with self.lock:
+            if cache_id in self.clients and force == False:
+                record_client(service_name, reused=True)
+                return self.clients[cache_id]
+            session = self.get_session(force)
+            if force == True:
+                # clients from the old session have refused credentials
+                self.clients = {}
+                self.resources = {}
+            self.clients[cache_id] = session.client(
+                service_name,
+                region_name=region_name,
+                config=get_client_config(client_config)
+            )
+            record_client(service_name, reused=False)
+            return self.clients[cache_id]
+
+    def get_resource(self, service_name, region_name=None, resource_config=None):
+        cache_id = (service_name, region_name)
+        with self.lock:
+            if cache_id not in self.resources:
+                session = self.get_session(False)
+                self.resources[cache_id] = session.resource(
+                    service_name,
+                    region_name=region_name,
+                    config=get_client_config(resource_config)
+                )
+            return self.resources[cache_id]
@@ -1,13 +1,71 @@
+import datetime
 import json
-import boto3
 import paco
 import os
 import sys
+import threading
+import time
+import weakref
+from botocore.credentials import RefreshableCredentials
+from paco.config.aws_clients import create_session
 from paco.core.exception import StackException
 from paco.core.exception import PacoException, PacoErrorCode
 from botocore.exceptions import ClientError, WaiterError
 
 
+# Held while loading or creating the MFA session credentials, so that accounts refreshing
+# at the same time are only prompted for an MFA token once
+session_creds_lock = threading.Lock()
+
+
+class CredentialRefresher(threading.Thread):
+    """
+    Daemon thread that renews the RefreshableCredentials of each PacoSTS before they expire.
+    botocore renews credentials when they are used within 15 minutes of expiring, this checks
+    them every minute so that renewing does not hold up an API call.
+
+    The refresher never prompts for an MFA token. If the MFA session has expired, the
+    credentials are left to be renewed by the next API call, which prompts for a token.
+    """
+    interval_secs = 60
+
+    def __init__(self):
+        super().__init__(name='paco-credential-refresher', daemon=True)
+        self.paco_sts_set = weakref.WeakSet()
+        self.lock = threading.Lock()
+
+    def add(self, paco_sts):
+        with self.lock:
+            self.paco_sts_set.add(paco_sts)
+
+    def run(self):
+        while True:
+            time.sleep(self.interval_secs)
+            with self.lock:
+                paco_sts_list = list(self.paco_sts_set)
+            for paco_sts in paco_sts_list:
+                try:
+                    paco_sts.refresh_in_background()
+                except Exception:
+                    # botocore tries again when the credentials are next used
+                    pass
+
+credential_refresher = None
+credential_refresher_lock = threading.Lock()
+
+def refresh_in_background(paco_sts):
+    "Renew the credentials of a PacoSTS in the background until it is no longer used"
+    global credential_refresher
+    with credential_refresher_lock:
+        if credential_refresher == None:
+            credential_refresher = CredentialRefresher()
+            credential_refresher.start()
+        credential_refresher.add(paco_sts)
+
+def is_refresher_thread():
+    return isinstance(threading.current_thread(), CredentialRefresher)
+
+
 class PacoSTS(object):
     """
     Provides temporary long term credentials that generate short term
@@ -15,7 +73,14 @@ class PacoSTS(object):
     expire, they are regenerated using the long term credentials. When
     The long term credentials expire, the user will be prompted for
     a new MFA token.
+
+    Credentials are cached with their Expiration and are trusted without
+    a call to STS until they are close to expiring. Sessions use RefreshableCredentials
+    which assume the role again before it expires, so clients never need to be
+    recreated.
     """
+    # Cached credentials are created again when they are this close to expiring
+    expiry_margin_secs = 300
 
     def __init__(
         self,
@@ -46,24 +111,37 @@ class PacoSTS(object):
         self.admin_iam_role_arn = admin_iam_role_arn
         self.org_admin_iam_role_arn = org_admin_iam_role_arn
         self.session = None
-        self.sts_client = boto3.client('sts')
 
     def get_temporary_credentials(self):
         return self.credentials
 
-    def load_temp_creds(self, creds_path):
+    def load_temp_creds(self, creds_path, validate=False):
+        """
+        Loads cached credentials, or returns None if they need to be created again.
+        Credentials that expire soon are not loaded. Credentials cached without an
+        Expiration by earlier versions of Paco, or all credentials if validate is True,
+        are checked with STS.
+        """
         try:
             with open(creds_path, 'r') as tmp_creds:
                 credentials = json.loads(tmp_creds.read())
-                client = boto3.client(
+        except (OSError, ValueError):
+            return None
+        expiration = credentials.get('Expiration', None)
+        if expiration != None and time.time() >= expiration - self.expiry_margin_secs:
+            return None
+        if expiration == None or validate == True:
+            try:
+                # a new Session for each client, as Sessions are not thread-safe
+                client = create_session().client(
                     'sts',
                     aws_access_key_id=credentials['AccessKeyId'],
                     aws_secret_access_key=credentials['SecretAccessKey'],
                     aws_session_token=credentials['SessionToken']
                 )
                 _ = client.get_caller_identity()['Account']
-        except:
-            return None
+            except:
+                return None
 
         return credentials
 
@@ -75,12 +153,18 @@ class PacoSTS(object):
         }
         if 'AWSDefaultRegion' in credentials.keys():
             select_creds['AWSDefaultRegion'] = credentials['AWSDefaultRegion']
+        if 'Expiration' in credentials.keys():
+            # STS returns a datetime, it is cached as seconds since the epoch
+            expiration = credentials['Expiration']
+            if hasattr(expiration, 'timestamp'):
+                expiration = expiration.timestamp()
+            select_creds['Expiration'] = expiration
         with open(creds_path, 'w') as tmp_creds:
             tmp_creds.write(json.dumps(select_creds))
             os.chmod(creds_path, 0o600)
 
     def create_session_temp_creds(self):
-        sts_client = boto3.client('sts',
+        sts_client = create_session().client('sts',
             region_name=self.admin_creds.aws_default_region,
             aws_access_key_id=self.admin_creds.aws_access_key_id,
             aws_secret_access_key=self.admin_creds.aws_secret_access_key,
@@ -95,7 +179,8 @@ You must have a properly formatted .credentials file to connect to AWS.
 Try running `paco init credentials` to create one.
 """)
             sys.exit()
-        token_code = input('MFA Token: {0}: '.format(self.account_ctx.get_name()))
+        with self.account_ctx.paco_ctx.interactive_lock:
+            token_code = input('MFA Token: {0}: '.format(self.account_ctx.get_name()))
         session_creds = sts_client.get_session_token(
             DurationSeconds=self.mfa_session_expiry_secs,
             TokenCode=token_code,
@@ -105,8 +190,24 @@ Try running `paco init credentials` to create one.
         self.save_temp_creds(session_creds, self.session_creds_path)
         return session_creds
 
+    def get_session_creds(self, validate=False):
+        """
+        Load the MFA session credentials, prompting for a new MFA token if they have expired.
+        The CredentialRefresher thread is never prompted, an exception is raised instead.
+        """
+        with session_creds_lock:
+            session_creds = self.load_temp_creds(self.session_creds_path, validate=validate)
+            if session_creds == None:
+                if is_refresher_thread():
+                    raise StackException(
+                        PacoErrorCode.Unknown,
+                        message="The MFA session has expired, a new MFA token is needed to renew the credentials."
+                    )
+                session_creds = self.create_session_temp_creds()
+        return session_creds
+
     def create_role_temp_creds(self, session_creds):
-        sts_client = boto3.client('sts',
+        sts_client = create_session().client('sts',
             region_name=session_creds['AWSDefaultRegion'],
             aws_access_key_id=session_creds['AccessKeyId'],
             aws_secret_access_key=session_creds['SecretAccessKey'],
@@ -132,8 +233,42 @@ Try running `paco init credentials` to create one.
                 break
         return role_creds
 
-    def get_temporary_session(self):
+    def get_credentials_metadata(self, role_creds):
+        "AssumeRole credentials in the format used by RefreshableCredentials"
+        expiration = role_creds['Expiration']
+        if hasattr(expiration, 'timestamp'):
+            expiration = expiration.timestamp()
+        return {
+            'access_key': role_creds['AccessKeyId'],
+            'secret_key': role_creds['SecretAccessKey'],
+            'token': role_creds['SessionToken'],
+            'expiry_time': datetime.datetime.fromtimestamp(expiration, datetime.timezone.utc).isoformat(),
+        }
+
+    def refresh_role_creds(self):
+        "Called by botocore to assume the role again before the AssumeRole credentials expire"
+        session_creds = self.get_session_creds()
+        role_creds = self.create_role_temp_creds(session_creds)
+        return self.get_credentials_metadata(role_creds)
+
+    def refresh_in_background(self):
+        "Called by the CredentialRefresher to renew credentials that expire soon, without prompting"
+        credentials = self.credentials
+        if credentials == None or credentials.refresh_needed() == False:
+            return
+        if self.load_temp_creds(self.session_creds_path) == None:
+            # the MFA session has expired, the next API call prompts for a new token
+            return
+        credentials.get_frozen_credentials()
+
+    def get_temporary_session(self, force=False):
         """
+        Returns a boto3 Session with RefreshableCredentials for the AssumeRole credentials.
+        The credentials are created once and shared by every Session for this account.
+
+        If force is True, the credentials have been refused by AWS. The AssumeRole
+        credentials are created again and the Session credentials are checked with STS.
+
         1. Load Temporary AssumeRole Credentials
             1.1 If NOT exist: Load Temporary Session Credentials
                 1.1.1 If do NOT exist
@@ -144,15 +279,19 @@ Try running `paco init credentials` to create one.
                 2.1.1 Generate and store Session Credentails
             2.2 Generate and store AssumeRole Credentials from Session
         """
-        role_creds = self.load_temp_creds(self.role_creds_path)
-        if role_creds == None:
-            session_creds = self.load_temp_creds(self.session_creds_path)
-            if session_creds == None:
-                session_creds = self.create_session_temp_creds()
-            role_creds = self.create_role_temp_creds(session_creds)
+        if self.credentials == None or force == True:
+            role_creds = None
+            if force == False:
+                role_creds = self.load_temp_creds(self.role_creds_path)
+            # credentials cached by earlier versions do not have an Expiration to refresh by
+            if role_creds == None or 'Expiration' not in role_creds:
+                session_creds = self.get_session_creds(validate=force)
+                role_creds = self.create_role_temp_creds(session_creds)
+            self.credentials = RefreshableCredentials.create_from_metadata(
+                metadata=self.get_credentials_metadata(role_creds),
+                refresh_using=self.refresh_role_creds,
+                method='paco-assume-role',
+            )
+            refresh_in_background(self)
 
-        return boto3.Session(
-            aws_access_key_id=role_creds['AccessKeyId'],
-            aws_secret_access_key=role_creds['SecretAccessKey'],
-            aws_session_token=role_creds['SessionToken'],
-        )
+        return create_session(credentials=self.credentials)
@@ -1,26 +1,22 @@
-import paco.config.aws_credentials
 import paco.core.log
-import paco.controllers
 import paco.models.services
+import concurrent.futures
 import os, sys, re
 import pathlib
 import pkg_resources
+import threading
 import ruamel.yaml
+from paco.core.diff import diff_documents
 from paco.core.exception import StackException
 from paco.core.exception import PacoErrorCode, MissingAccountId, InvalidAccountName
 from paco.models import vocabulary
 from paco.models.references import Reference
 from paco.models import references
-from paco.models import load_project_from_yaml
+from paco.config.aws_clients import ClientCache, get_client_stats
+from paco.utils.cache import load_cached_project
 from paco.core.yaml import read_yaml_file
 from shutil import copyfile
 
-# deepdiff turns on Deprecation warnings, we need to turn them back off
-# again right after import, otherwise 3rd libs spam dep warnings all over the place
-from deepdiff import DeepDiff
-import warnings
-warnings.simplefilter("ignore")
-
 
 class AccountContext(object):
     "Manages the credentials and connection to an AWS Account"
@@ -32,8 +28,7 @@ class AccountContext(object):
         mfa_account=None
     ):
         self.name = name
-        self.client_cache = {}
-        self.resource_cache = {}
+        self.client_cache = ClientCache(self.get_session)
         self.paco_ctx = paco_ctx
         try:
             self.config = paco_ctx.project['accounts'][name]
@@ -88,6 +83,7 @@ Add this manually or run `paco provision accounts` for this project.
         return self.aws_session.get_temporary_credentials()
 
     def get_mfa_session(self, admin_creds):
+        import paco.config.aws_credentials
         if self.aws_session == None:
             self.aws_session = paco.config.aws_credentials.PacoSTS(
                 self,
@@ -103,6 +99,7 @@ Add this manually or run `paco provision accounts` for this project.
         return self.aws_session.get_temporary_session()
 
     def get_session(self, force=False):
+        import paco.config.aws_credentials
         if self.aws_session == None:
             self.aws_session = paco.config.aws_credentials.PacoSTS(
                     self,
@@ -116,7 +113,7 @@ Add this manually or run `paco provision accounts` for this project.
                     assume_role_session_expiry_secs=self.assume_role_session_expiry_secs
             )
         if self.temp_aws_session == None or force == True:
-            self.temp_aws_session = self.aws_session.get_temporary_session()
+            self.temp_aws_session = self.aws_session.get_temporary_session(force)
 
         return self.temp_aws_session
 
@@ -128,24 +125,10 @@ Add this manually or run `paco provision accounts` for this project.
         return self.config.account_id
 
     def get_aws_client(self, client_name, aws_region=None, client_config=None, force=False):
-        client_id = client_name
-        if aws_region != None:
-            client_id += aws_region
-        if client_id not in self.client_cache.keys() or force == True:
-            session = self.get_session(force)
-            self.client_cache[client_id] = session.client(
-                client_name, region_name=aws_region, config=client_config)
-        return self.client_cache[client_id]
+        return self.client_cache.get_client(client_name, aws_region, client_config, force)
 
     def get_aws_resource(self, resource_name, aws_region=None, resource_config=None):
-        resource_id = resource_name
-        if aws_region != None:
-            resource_id += aws_region
-        if resource_id not in self.resource_cache.keys():
-            session = self.get_session()
-            self.resource_cache[resource_id] = session.resource(
-                resource_name, region_name=aws_region, config=resource_config)
-        return self.resource_cache[resource_id]
+        return self.client_cache.get_resource(resource_name, aws_region, resource_config)
 
 
 # deep diff formatting
@@ -227,6 +210,7 @@ class PacoContext(object):
         # CLI Flags
         self.verbose = False
         self.nocache = False
+        self.refresh = False
         self.yes = False
         self.quiet_changes_only = False
         self.paco_path = os.getcwd()
@@ -239,7 +223,20 @@ class PacoContext(object):
         self.project = None
         self.master_account = None
         self.command = None
+        self.config_scope = None
         self.disable_validation = False
+        # Number of Stacks that can be provisioned concurrently
+        self.max_workers = 1
+        # Provision each region of a NetworkEnvironment concurrently
+        self.parallel_regions = False
+        # Held while displaying changes and prompting so that concurrent
+        # Stacks do not interleave their confirmations
+        self.interactive_lock = threading.RLock()
+        # Resolved references by (paco_ref, account name)
+        self.ref_cache = {}
+        self.ref_cache_lock = threading.Lock()
+        self.ref_cache_hits = 0
+        self.ref_cache_misses = 0
 
     def get_account_context(self, account_ref=None, account_name=None, netenv_ref=None):
         if account_ref != None:
@@ -265,6 +262,69 @@ class PacoContext(object):
 
         return account_ctx
 
+    def get_scope_account_names(self):
+        """
+        Returns the names of the accounts that the CONFIG_SCOPE provisions to or references.
+        These are found from the 'paco.ref accounts.<name>' references in the scope.
+        """
+        if self.config_scope == None:
+            return []
+        if self.config_scope == 'accounts':
+            return sorted(self.project['accounts'].keys())
+        from paco.models import schemas
+        from paco.models.locations import get_parent_by_interface
+        from paco.models.references import get_model_obj_from_ref
+        from paco.utils import get_model_refs
+        try:
+            model_obj = get_model_obj_from_ref('paco.ref ' + self.config_scope, self.project)
+        except Exception:
+            # an invalid scope is reported once the project has loaded
+            return []
+        refs = get_model_refs(model_obj)
+        # an Application is provisioned to the account of it's EnvironmentRegion
+        env_region = get_parent_by_interface(model_obj, schemas.IEnvironmentRegion)
+        if env_region != None and env_region.network.aws_account != None:
+            refs.add(env_region.network.aws_account)
+        account_names = set()
+        for ref in refs:
+            parts = ref.split(' ', 1)[1].split('.')
+            if parts[0] == 'accounts' and len(parts) > 1 and parts[1] in self.project['accounts']:
+                account_names.add(parts[1])
+        return sorted(account_names)
+
+    def prefetch_account_sessions(self):
+        """
+        Assume the admin role of every account in the CONFIG_SCOPE concurrently, so that
+        each account does not wait on STS in turn when it is first used. The MFA session
+        is created first, so there is only ever a single MFA prompt.
+        """
+        account_ctxs = []
+        for account_name in self.get_scope_account_names():
+            if account_name == 'master':
+                continue
+            try:
+                account_ctxs.append(self.get_account_context(account_name=account_name))
+            except (MissingAccountId, InvalidAccountName):
+                # reported when the account is used
+                continue
+        if len(account_ctxs) == 0:
+            return
+        self.master_account.aws_session.get_session_creds()
+
+        def get_session(account_ctx):
+            with account_ctx.client_cache.lock:
+                account_ctx.get_session()
+
+        self.log_action_col('Init', 'Accounts', 'Credentials', '{} accounts'.format(len(account_ctxs)))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(account_ctxs)) as executor:
+            futures = [executor.submit(get_session, account_ctx) for account_ctx in account_ctxs]
+            for account_ctx, future in zip(account_ctxs, futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    # the role is assumed again, and any error raised, when the account is used
+                    self.vlog("Unable to assume role for account {}: {}".format(account_ctx.get_name(), e))
+
     def get_region_from_ref(self, netenv_ref):
         region = netenv_ref.split(' ')[1]
         region = region.split('.')[3]
@@ -278,9 +338,9 @@ class PacoContext(object):
         if project_init == True:
             return
 
-        # Load the model from YAML
+        # Load the model from the model cache, or YAML if project files have changed
         print("Loading Paco project: %s" % (self.home))
-        self.project = load_project_from_yaml(self.project_folder, None)
+        self.project = load_cached_project(self.project_folder, refresh=self.nocache)
         if project_only == True:
             return
 
@@ -294,6 +354,7 @@ class PacoContext(object):
         os.environ['AWS_DEFAULT_REGION'] = self.project['credentials'].aws_default_region
         if master_only:
             return
+        self.prefetch_account_sessions()
 
         # Initialize Controllers so they can initialize their
         # resolve_ref_obj's to allow reference lookups
@@ -326,6 +387,8 @@ class PacoContext(object):
             if controller_type in self.controllers:
                 controller = self.controllers[controller_type]
             if controller == None:
+                # Controllers, and the templates they use, are imported when first needed
+                import paco.controllers
                 controller = paco.controllers.klass[controller_type](self)
                 self.controllers[controller_type] = controller
         else:
@@ -361,12 +424,52 @@ class PacoContext(object):
 
         Note that for `paco.ref accounts.<account-name>` references, the acount id is returned
         and not the object.
+
+        Resolved references are cached until invalidate_ref_cache() is called.
         """
-        return references.resolve_ref(
+        cache_key = (paco_ref, None)
+        if account_ctx != None:
+            cache_key = (paco_ref, account_ctx.get_name())
+        with self.ref_cache_lock:
+            if cache_key in self.ref_cache:
+                self.ref_cache_hits += 1
+                return self.ref_cache[cache_key]
+            self.ref_cache_misses += 1
+        ref = Reference(paco_ref)
+        value = references.resolve_ref(
             paco_ref,
             self.project,
-            account_ctx=account_ctx
+            account_ctx=account_ctx,
+            ref=ref
         )
+        if self.is_ref_value_cacheable(ref, value):
+            with self.ref_cache_lock:
+                self.ref_cache[cache_key] = value
+        return value
+
+    def is_ref_value_cacheable(self, ref, value):
+        """
+        References that did not resolve are not cached. Neither are references to model objects
+        that do not have a resolve_ref_obj yet, as these are looked up in the Outputs files until
+        the object has been initialized.
+        """
+        if value == None:
+            return False
+        if ref.resource != None and hasattr(ref.resource, 'resolve_ref_obj') == False:
+            return False
+        return True
+
+    def invalidate_ref_cache(self):
+        "Clear the resolved references, called when stack outputs change"
+        with self.ref_cache_lock:
+            self.ref_cache = {}
+
+    def log_ref_cache_stats(self):
+        self.vlog("Reference cache: {} hits, {} misses".format(self.ref_cache_hits, self.ref_cache_misses))
+
+    def log_aws_client_stats(self):
+        for service_name, stats in sorted(get_client_stats().items()):
+            self.vlog("AWS {} clients: {} created, {} reused".format(service_name, stats['created'], stats['reused']))
 
     def confirm_yaml_changes(self, model_obj):
         """Confirm changes made to the Paco Project YAML from the last run"""
@@ -375,14 +478,12 @@ class PacoContext(object):
         applied_file_path, new_file_path = self.init_model_obj_store(model_obj)
         if applied_file_path.exists() == False:
             return
+        # unchanged files do not need to be loaded and compared
+        if applied_file_path.read_bytes() == new_file_path.read_bytes():
+            return
         applied_file_dict = read_yaml_file(applied_file_path)
         new_file_dict = read_yaml_file(new_file_path)
-        deep_diff = DeepDiff(
-            applied_file_dict,
-            new_file_dict,
-            verbose_level=1,
-            view='tree'
-        )
+        deep_diff = diff_documents(applied_file_dict, new_file_dict)
         if len(deep_diff.keys()) == 0:
             return
 
@@ -439,14 +540,15 @@ class PacoContext(object):
             prompt = " [y/N] "
         else:
             raise ValueError("Invalid default answer: '%s'" % default)
-        while True:
-            answer = input(question + prompt).lower()
-            if default is not None and answer == '':
-                return valid[default]
-            elif answer in valid:
-                return valid[answer]
-            else:
-                print("Please respond with 'y' or 'n' (or 'yes' or 'no').\n")
+        with self.interactive_lock:
+            while True:
+                answer = input(question + prompt).lower()
+                if default is not None and answer == '':
+                    return valid[default]
+                elif answer in valid:
+                    return valid[answer]
+                else:
+                    print("Please respond with 'y' or 'n' (or 'yes' or 'no').\n")
 
     def legacy_flag(self, flag):
         if flag in self.project.legacy_flags:
@@ -0,0 +1,41 @@
+import pytest
+
+boto3 = pytest.importorskip('boto3')
+from paco.config import aws_clients
+
+
+def test_sessions_share_loader():
+    session_one = aws_clients.create_session(region_name='us-west-2')
+    session_two = aws_clients.create_session(region_name='us-west-2')
+    loader = aws_clients.get_shared_loader()
+    assert session_one._session.get_component('data_loader') is loader
+    assert session_two._session.get_component('data_loader') is loader
+    assert len(loader.search_paths) == len(set(loader.search_paths))
+
+def test_session_uses_given_credentials():
+    from botocore.credentials import Credentials
+    credentials = Credentials('AKIAEXAMPLE', 'secret', 'token')
+    session = aws_clients.create_session(region_name='us-west-2', credentials=credentials)
+    assert session.get_credentials() is credentials
+
+def test_client_cache_reuses_clients():
+    sessions = []
+    def get_session(force):
+        if force == True or len(sessions) == 0:
+            sessions.append(aws_clients.create_session(
+                aws_access_key_id='testing',
+                aws_secret_access_key='testing',
+                region_name='us-west-2'
+            ))
+        return sessions[-1]
+    cache = aws_clients.ClientCache(get_session)
+    before = aws_clients.get_client_stats().get('sqs', {'created': 0, 'reused': 0})
+    client = cache.get_client('sqs', 'us-west-2')
+    assert cache.get_client('sqs', 'us-west-2') is client
+    assert client.meta.config.max_pool_connections == aws_clients.max_pool_connections
+    assert client.meta.config.retries['mode'] == 'adaptive'
+    assert cache.get_client('sqs', 'us-west-2', force=True) is not client
+    assert len(sessions) == 2
+    after = aws_clients.get_client_stats()['sqs']
+    assert after['created'] - before['created'] == 2
+    assert after['reused'] - before['reused'] == 1
@@ -1,5 +1,6 @@
 import click
 import os
+import threading
 import time
 from paco.aws_api.acm import DNSValidatedACMCertClient
 from paco.core.exception import StackException
@@ -16,6 +17,8 @@ class ACMController(Controller):
         )
         self.cert_config_map = {}
         self.cert_config_list = []
+        # Regions can be provisioned concurrently
+        self.provision_lock = threading.Lock()
 
     def init(self, command=None, model_obj=None):
         pass
@@ -28,6 +31,10 @@ class ACMController(Controller):
         Creates a certificate if one does not exists, then adds DNS validation records
         to the Route53 Hosted Zone.
         """
+        with self.provision_lock:
+            self.provision_certificates()
+
+    def provision_certificates(self):
         for acm_config in self.cert_config_list:
             cert_config = acm_config['config']
             if cert_config.is_enabled() == False:
@@ -1,20 +1,23 @@
 import click
+import concurrent.futures
 import getpass
 import os
 import pathlib
+import sys
 from paco import utils
 from paco.controllers.controllers import Controller
 from paco.core.exception import StackException
 from paco.core.exception import PacoErrorCode
-from paco.core.yaml import YAML
+from paco.core.log import ThreadPrefixStream, prefixed_output
+from paco.core.yaml import fast_yaml
+from paco.models.references import Reference
 from paco.stack_grps.grp_application import ApplicationStackGroup
 from paco.stack_grps.grp_network import NetworkStackGroup
 from paco.stack_grps.grp_secretsmanager import SecretsManagerStackGroup
 from paco.stack_grps.grp_backup import BackupVaultsStackGroup
 from paco.stack_group import StackTags, stack_group, StackGroup
 
-yaml=YAML(typ="safe", pure=True)
-yaml.default_flow_sytle = False
+yaml = fast_yaml()
 
 
 class EnvironmentContext():
@@ -96,7 +99,8 @@ class EnvironmentContext():
         #    iam_stack_grp.init()
 
         # Application Engine Stacks
-        for app_id in self.application_ids():
+        scoped_app_ids, scoped_refs = self.get_scoped_application_ids()
+        for app_id in scoped_app_ids:
             application_stack_grp = ApplicationStackGroup(
                 self.paco_ctx,
                 self.account_ctx,
@@ -109,7 +113,7 @@ class EnvironmentContext():
             application_stack_grp.init()
 
         # Backup
-        if self.config.backup_vaults:
+        if self.config.backup_vaults and (scoped_refs == None or self.is_backup_vaults_scoped(scoped_refs)):
             self.backup_stack_grp = BackupVaultsStackGroup(
                 self.paco_ctx,
                 self.account_ctx,
@@ -192,6 +196,48 @@ class EnvironmentContext():
 
         return ordered_id_list
 
+    def get_scoped_application_ids(self):
+        """
+        Returns the ids of the Applications needed for the CONFIG_SCOPE and the references
+        used by them. If the scope is within an Application, only that Application and the
+        Applications it references are needed. Otherwise every Application is needed and
+        None is returned for the references.
+        """
+        app_ids = self.application_ids()
+        scope_parts = self.stack_group_filter.split('.')
+        if len(scope_parts) < 6 or scope_parts[2] != self.env_id or scope_parts[3] != self.region \
+            or scope_parts[4] != 'applications':
+            return app_ids, None
+        scoped_app_ids = set()
+        scoped_refs = set()
+        pending = [scope_parts[5]]
+        while len(pending) > 0:
+            app_id = pending.pop()
+            if app_id in scoped_app_ids or app_id not in self.config['applications'].keys():
+                continue
+            scoped_app_ids.add(app_id)
+            for ref in utils.get_model_refs(self.config['applications'][app_id]):
+                scoped_refs.add(ref)
+                ref_parts = Reference(ref).parts
+                if ref_parts[0] != 'netenv' or ref_parts[1] != self.netenv_id or 'applications' not in ref_parts:
+                    continue
+                idx = ref_parts.index('applications')
+                if idx + 1 < len(ref_parts):
+                    pending.append(ref_parts[idx + 1])
+        for app_id in app_ids:
+            if app_id not in scoped_app_ids:
+                self.paco_ctx.log_action_col('Skipping', 'Application', app_id)
+        return [app_id for app_id in app_ids if app_id in scoped_app_ids], scoped_refs
+
+    def is_backup_vaults_scoped(self, scoped_refs):
+        "Returns True if any of the scoped references are to the BackupVaults of this environment and region"
+        for ref in scoped_refs:
+            ref_parts = Reference(ref).parts
+            if ref_parts[:4] == ['netenv', self.netenv_id, self.env_id, self.region] \
+                and len(ref_parts) > 4 and ref_parts[4] == 'backup_vaults':
+                return True
+        return False
+
     def deployment_ids(self, app_id):
         self.config.applications[app_id].resources.deployments()
         #for resource in self.config.applications[app_id].resources:
@@ -240,6 +286,7 @@ class EnvironmentContext():
                         stream=output_fd)
 
     def validate(self):
+        self.paco_ctx.log_action_col('Validate', 'Environment', self.env_id+' '+self.region)
         for stack_grp in self.stack_grps:
             stack_grp.validate()
 
@@ -433,20 +480,60 @@ class NetEnvController(Controller):
                 self.init_sub_env(env_id, region)
         self.paco_ctx.log_action_col("Init", "NetEnv", self.netenv_id, "Complete")
 
-    def validate(self):
-        self.paco_ctx.log_action_col("Validate", "NetEnv", self.netenv_id)
+    def sub_env_action(self, action_name):
+        """
+        Calls an action method on each EnvironmentContext. With --parallel-regions
+        every region runs concurrently, each with it's output prefixed with the
+        environment and region, and any failures are reported together once all of
+        the regions have finished.
+        """
+        env_ctx_list = []
         for env_id in self.sub_envs.keys():
             for region in self.sub_envs[env_id].keys():
-                self.paco_ctx.log_action_col('Validate', 'Environment', env_id+' '+region)
-                self.sub_envs[env_id][region].validate()
+                env_ctx_list.append(self.sub_envs[env_id][region])
+
+        if self.paco_ctx.parallel_regions == False or len(env_ctx_list) < 2:
+            for env_ctx in env_ctx_list:
+                getattr(env_ctx, action_name)()
+            return
+
+        def run_env_action(env_ctx):
+            with prefixed_output(stdout, '[{} {}] '.format(env_ctx.env_id, env_ctx.region)):
+                getattr(env_ctx, action_name)()
+
+        failures = []
+        original_stdout = sys.stdout
+        stdout = ThreadPrefixStream(original_stdout)
+        sys.stdout = stdout
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(env_ctx_list)) as executor:
+                futures = [executor.submit(run_env_action, env_ctx) for env_ctx in env_ctx_list]
+                for env_ctx, future in zip(env_ctx_list, futures):
+                    error = future.exception()
+                    if error != None:
+                        failures.append([env_ctx, error])
+        finally:
+            sys.stdout = original_stdout
+
+        if len(failures) > 0:
+            message = "{} of {} regions failed to {}:\n".format(len(failures), len(env_ctx_list), action_name)
+            for env_ctx, error in failures:
+                if isinstance(error, SystemExit):
+                    error_message = 'Aborted'
+                else:
+                    error_message = getattr(error, 'message', None) or str(error) or error.__class__.__name__
+                message += "\n{} {}: {}\n".format(env_ctx.env_id, env_ctx.region, error_message)
+            raise StackException(PacoErrorCode.Unknown, message=message)
+
+    def validate(self):
+        self.paco_ctx.log_action_col("Validate", "NetEnv", self.netenv_id)
+        self.sub_env_action('validate')
         self.paco_ctx.log_action_col("Validate", "NetEnv", self.netenv_id, 'Completed')
 
     def provision(self):
         self.confirm_yaml_changes(self.config)
         self.paco_ctx.log_action_col("Provision", "NetEnv", self.netenv_id)
-        for env_id in self.sub_envs.keys():
-            for region in self.sub_envs[env_id].keys():
-                self.sub_envs[env_id][region].provision()
+        self.sub_env_action('provision')
         self.apply_model_obj()
         self.paco_ctx.log_action_col("Provision", "NetEnv", self.netenv_id, "Completed")
 
@@ -455,9 +542,7 @@ class NetEnvController(Controller):
         env_ctx.backup(config_arg['resource'])
 
     def delete(self):
-        for env_id in self.sub_envs.keys():
-            for region in self.sub_envs[env_id].keys():
-                self.sub_envs[env_id][region].delete()
+        self.sub_env_action('delete')
 
     def get_aws_name(self):
         return '-'.join([super().get_aws_name(), self.netenv_id])
@@ -0,0 +1,94 @@
+"""
+Structural diff of YAML documents, such as CloudFormation templates and Paco model files.
+
+The result has the same shape as a tree view DeepDiff with verbose_level=1: a dict of change
+types, each a list of changes with a path() and the old (t1) and new (t2) values.
+"""
+
+from collections.abc import Mapping
+
+
+class DiffItem():
+    "A single change between two documents"
+
+    def __init__(self, path, t1=None, t2=None):
+        self.path_parts = path
+        self.t1 = t1
+        self.t2 = t2
+
+    def path(self):
+        "The path to the change in DeepDiff format, e.g. root['Resources']['Topic'][0]"
+        return 'root' + ''.join(['[{!r}]'.format(part) for part in self.path_parts])
+
+    def __repr__(self):
+        return '<DiffItem {} t1:{!r} t2:{!r}>'.format(self.path(), self.t1, self.t2)
+
+
+def get_kind(value):
+    "Values are compared as dict, list or their own type"
+    if isinstance(value, Mapping):
+        return dict
+    if isinstance(value, (list, tuple)):
+        return list
+    if isinstance(value, str):
+        return str
+    return type(value)
+
+def get_state(value):
+    """
+    A comparable form of an object that is not a dict, list or scalar, such as a ruamel.yaml
+    TaggedScalar, which does not compare equal to an identical object.
+    """
+    state = {}
+    for name, attr in vars(value).items():
+        # skip comments and line numbers
+        if name.startswith('_yaml_') and name != '_yaml_tag':
+            continue
+        if hasattr(attr, '__dict__'):
+            attr = get_state(attr)
+        state[name] = attr
+    return state
+
+def diff_documents(t1, t2):
+    """
+    Returns the changes between two loaded YAML documents as a dict of change type to a list of
+    DiffItems, or an empty dict if they are the same. Equal subtrees, such as the unchanged
+    Resources of a template keyed by logical id, are skipped with a single comparison so the time
+    taken depends on how much has changed. Lists are compared by index.
+    """
+    changes = {}
+    diff_value(t1, t2, (), changes)
+    return changes
+
+def add_change(changes, change_type, item):
+    if change_type not in changes:
+        changes[change_type] = []
+    changes[change_type].append(item)
+
+def diff_value(t1, t2, path, changes):
+    kind = get_kind(t1)
+    if kind != get_kind(t2):
+        add_change(changes, 'type_changes', DiffItem(path, t1, t2))
+        return
+    if t1 == t2:
+        return
+    if kind == dict:
+        for key in t1.keys():
+            if key not in t2:
+                add_change(changes, 'dictionary_item_removed', DiffItem(path + (key,), t1=t1[key]))
+        for key in t2.keys():
+            if key not in t1:
+                add_change(changes, 'dictionary_item_added', DiffItem(path + (key,), t2=t2[key]))
+            else:
+                diff_value(t1[key], t2[key], path + (key,), changes)
+    elif kind == list:
+        for idx in range(min(len(t1), len(t2))):
+            diff_value(t1[idx], t2[idx], path + (idx,), changes)
+        for idx in range(len(t2), len(t1)):
+            add_change(changes, 'iterable_item_removed', DiffItem(path + (idx,), t1=t1[idx]))
+        for idx in range(len(t1), len(t2)):
+            add_change(changes, 'iterable_item_added', DiffItem(path + (idx,), t2=t2[idx]))
+    else:
+        if hasattr(t1, '__dict__') and get_state(t1) == get_state(t2):
+            return
+        add_change(changes, 'values_changed', DiffItem(path, t1, t2))
@@ -1,5 +1,7 @@
+import contextlib
 import logging
 import sys
+import threading
 
 #logging.basicConfig(
 #    level=logging.DEBUG,
@@ -18,3 +20,69 @@ def get_paco_logger():
 # logger.warn
 # logger.error
 # logger.critical
+
+
+class ThreadPrefixStream():
+    """
+    Wraps an output stream so that each line written by a thread which has set
+    a prefix is prefixed with it. Lines are written whole so that output from
+    concurrent threads does not interleave within a line.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def set_prefix(self, prefix):
+        self.local.prefix = prefix
+        self.local.buffer = ''
+        self.local.line_start = True
+
+    def write(self, data):
+        prefix = getattr(self.local, 'prefix', None)
+        if prefix == None:
+            return self.stream.write(data)
+        self.local.buffer += data
+        if '\n' in self.local.buffer:
+            lines, self.local.buffer = self.local.buffer.rsplit('\n', 1)
+            self.write_lines(prefix, lines + '\n')
+        return len(data)
+
+    def write_lines(self, prefix, data):
+        newline = ''
+        if data.endswith('\n'):
+            data = data[:-1]
+            newline = '\n'
+        output = '\n'.join([prefix + line for line in data.split('\n')]) + newline
+        if self.local.line_start == False:
+            # continue a line that was flushed before it was complete
+            output = output[len(prefix):]
+        self.local.line_start = newline != ''
+        with self.lock:
+            self.stream.write(output)
+
+    def flush(self):
+        prefix = getattr(self.local, 'prefix', None)
+        if prefix != None and self.local.buffer != '':
+            # partial lines are flushed for input() prompts
+            self.write_lines(prefix, self.local.buffer)
+            self.local.buffer = ''
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+@contextlib.contextmanager
+def prefixed_output(stream, prefix):
+    """
+    Prefix every line the current thread writes to a ThreadPrefixStream. The stream must
+    be installed as sys.stdout before any of the prefixing threads are started.
+    """
+    stream.set_prefix(prefix)
+    try:
+        yield
+    finally:
+        stream.flush()
+        stream.set_prefix(None)
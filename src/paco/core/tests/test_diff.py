@@ -0,0 +1,49 @@
+from paco.core.diff import diff_documents
+
+
+def paths(changes, change_type):
+    return [item.path() for item in changes.get(change_type, [])]
+
+def test_diff_same():
+    template = {'Resources': {'Topic': {'Type': 'AWS::SNS::Topic', 'Properties': {'Tags': [1, 2]}}}}
+    assert diff_documents(template, {'Resources': {'Topic': {'Type': 'AWS::SNS::Topic', 'Properties': {'Tags': [1, 2]}}}}) == {}
+
+def test_diff_changes():
+    applied = {
+        'Parameters': {'Name': {'Type': 'String'}},
+        'Resources': {
+            'Topic': {'Type': 'AWS::SNS::Topic', 'Properties': {'TopicName': 'old', 'Tags': [1, 2, 3]}},
+            'Queue': {'Type': 'AWS::SQS::Queue'},
+        },
+    }
+    new = {
+        'Parameters': {'Name': {'Type': 'Number'}},
+        'Resources': {
+            'Topic': {'Type': 'AWS::SNS::Topic', 'Properties': {'TopicName': 'new', 'Tags': [1, 2]}},
+            'Bucket': {'Type': 'AWS::S3::Bucket'},
+        },
+        'Outputs': {'TopicArn': {'Value': 'arn'}},
+    }
+    changes = diff_documents(applied, new)
+    assert paths(changes, 'values_changed') == [
+        "root['Parameters']['Name']['Type']",
+        "root['Resources']['Topic']['Properties']['TopicName']",
+    ]
+    assert changes['values_changed'][1].t1 == 'old'
+    assert changes['values_changed'][1].t2 == 'new'
+    assert paths(changes, 'dictionary_item_removed') == ["root['Resources']['Queue']"]
+    assert paths(changes, 'dictionary_item_added') == ["root['Resources']['Bucket']", "root['Outputs']"]
+    assert paths(changes, 'iterable_item_removed') == ["root['Resources']['Topic']['Properties']['Tags'][2]"]
+    assert changes['iterable_item_removed'][0].t1 == 3
+
+def test_diff_type_changes():
+    changes = diff_documents({'Value': '1'}, {'Value': 1})
+    assert paths(changes, 'type_changes') == ["root['Value']"]
+
+def test_diff_objects_by_state():
+    class TaggedScalar():
+        def __init__(self, value):
+            self.value = value
+            self._yaml_line_col = object()
+    assert diff_documents({'Ref': TaggedScalar('A')}, {'Ref': TaggedScalar('A')}) == {}
+    assert paths(diff_documents({'Ref': TaggedScalar('A')}, {'Ref': TaggedScalar('B')}), 'values_changed') == ["root['Ref']"]
@@ -0,0 +1,69 @@
+"""
+Micro-benchmark of loading and dumping build files with the pure-Python and libyaml-backed YAML.
+
+Set PACO_BENCHMARK_BUILD to a Paco project's build folder to benchmark it's templates and
+state files, otherwise generated files are used. Run with 'pytest -s' to see the timings.
+The libyaml-backed YAML is only asserted to be faster when PACO_BENCHMARK is set.
+"""
+
+import os
+import pathlib
+import pytest
+import time
+
+ruamel_yaml = pytest.importorskip('ruamel.yaml')
+from paco.core.yaml import HAS_LIBYAML, YAML, CFNSafeConstructor, fast_yaml, load_cfn_template
+
+
+def generate_build_folder(path):
+    for i in range(10):
+        lines = ['AWSTemplateFormatVersion: 2010-09-09', 'Resources:']
+        for j in range(100):
+            lines.append("  Topic{}:".format(j))
+            lines.append("    Type: AWS::SNS::Topic")
+            lines.append("    Properties:")
+            lines.append("      TopicName: !Sub 'topic-{}-${{AWS::Region}}'".format(j))
+            lines.append("      KmsMasterKeyId: !GetAtt 'Key.Arn'")
+            lines.append("      Tags:")
+            lines.append("        - {Key: Name, Value: topic}")
+        (path / 'template-{}.yaml'.format(i)).write_text('\n'.join(lines) + '\n')
+    return path
+
+def get_build_files(tmp_path):
+    build_folder = os.environ.get('PACO_BENCHMARK_BUILD', None)
+    if build_folder == None:
+        build_folder = generate_build_folder(tmp_path)
+    build_files = [path for path in pathlib.Path(build_folder).glob('**/*.yaml') if path.is_file()]
+    if len(build_files) == 0:
+        pytest.skip("No YAML files in {}".format(build_folder))
+    return [path.read_text() for path in build_files]
+
+def pure_load_cfn_template(body):
+    yaml = ruamel_yaml.YAML(typ="safe", pure=True)
+    yaml.Constructor = CFNSafeConstructor
+    yaml.allow_duplicate_keys = True
+    return yaml.load(body)
+
+def timed(func, bodies):
+    start = time.perf_counter()
+    results = [func(body) for body in bodies]
+    return time.perf_counter() - start, results
+
+
+def test_yaml_load_and_dump_benchmark(tmp_path):
+    bodies = get_build_files(tmp_path)
+    pure_load_time, pure_docs = timed(pure_load_cfn_template, bodies)
+    fast_load_time, fast_docs = timed(load_cfn_template, bodies)
+    assert fast_docs == pure_docs
+
+    pure_yaml = YAML(typ="safe", pure=True)
+    state_docs = [{'stack_names': list(doc.get('Resources', {}).keys()) if isinstance(doc, dict) else []} for doc in pure_docs]
+    pure_dump_time, pure_dumps = timed(pure_yaml.dump, state_docs)
+    fast_dump_time, fast_dumps = timed(fast_yaml().dump, state_docs)
+    assert [fast_yaml().load(body) for body in fast_dumps] == state_docs
+
+    print("\n{} files, libyaml {}".format(len(bodies), 'installed' if HAS_LIBYAML else 'not installed'))
+    print("load: pure {:.3f}s fast {:.3f}s".format(pure_load_time, fast_load_time))
+    print("dump: pure {:.3f}s fast {:.3f}s".format(pure_dump_time, fast_dump_time))
+    if HAS_LIBYAML and os.environ.get('PACO_BENCHMARK', None) != None:
+        assert fast_load_time < pure_load_time
@@ -2,6 +2,13 @@ import sys
 import ruamel.yaml
 from ruamel.yaml.compat import StringIO
 
+# ruamel.yaml uses the libyaml-backed parser and emitter for typ="safe" when they are installed
+try:
+    import _ruamel_yaml
+    HAS_LIBYAML = True
+except ImportError:
+    HAS_LIBYAML = False
+
 class Ref:
     yaml_tag = u'!Ref:'
 
@@ -57,9 +64,65 @@ class YAML(ruamel.yaml.YAML):
         if dumps:
             return stream.getvalue()
 
+class CFNTag():
+    "A CloudFormation short form function, such as !GetAtt, loaded from a template"
+
+    def __init__(self, tag, value):
+        self.tag = tag
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, CFNTag) and self.tag == other.tag and self.value == other.value
+
+    def __repr__(self):
+        return '{} {!r}'.format(self.tag, self.value)
+
+    def __str__(self):
+        return '{} {}'.format(self.tag, self.value)
+
+
+class CFNSafeConstructor(ruamel.yaml.SafeConstructor):
+    "SafeConstructor that loads the tags used by CloudFormation templates"
+
+def construct_cfn_tag(constructor, tag_suffix, node):
+    if isinstance(node, ruamel.yaml.ScalarNode):
+        value = constructor.construct_scalar(node)
+    elif isinstance(node, ruamel.yaml.SequenceNode):
+        value = constructor.construct_sequence(node, deep=True)
+    else:
+        value = constructor.construct_mapping(node, deep=True)
+    return CFNTag('!' + tag_suffix, value)
+
+CFNSafeConstructor.add_multi_constructor('!', construct_cfn_tag)
+
+
+def fast_yaml():
+    """
+    Returns a safe YAML for the files that Paco writes itself. It uses libyaml if it is
+    installed and the pure-Python implementation otherwise.
+    """
+    return YAML(typ="safe")
+
+def load_cfn_template(body):
+    """
+    Loads a CloudFormation YAML template. Short form functions that Paco does not handle as
+    strings are loaded as CFNTags. The pure-Python parser is only used if libyaml fails.
+    """
+    yaml = ruamel.yaml.YAML(typ="safe")
+    yaml.Constructor = CFNSafeConstructor
+    yaml.allow_duplicate_keys = True
+    try:
+        return yaml.load(body)
+    except ruamel.yaml.YAMLError:
+        if HAS_LIBYAML == False:
+            raise
+    yaml = ruamel.yaml.YAML(typ="safe", pure=True)
+    yaml.Constructor = CFNSafeConstructor
+    yaml.allow_duplicate_keys = True
+    return yaml.load(body)
+
 def read_yaml_file(path):
-    yaml = YAML(typ="safe", pure=True)
-    yaml.default_flow_sytle = False
+    yaml = fast_yaml()
     with open(path, 'r') as stream:
         data = yaml.load(stream)
     return data
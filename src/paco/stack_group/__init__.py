@@ -4,4 +4,6 @@ from paco.stack_group.stack_group import StackGroup
 from paco.stack_group.stack_group import StackHooks
 from paco.stack_group.stack_group import StackOrder
 from paco.stack_group.stack_group import StackTags
+from paco.stack_group.scheduler import StackScheduler
 
+from paco.stack_group.stack_store import StackStore
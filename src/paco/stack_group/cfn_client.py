@@ -0,0 +1,187 @@
+"""
+Rate limited CloudFormation clients shared by an account and region.
+"""
+
+import random
+import threading
+import time
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from botocore.exceptions import ConnectionError as BotocoreConnectionError
+from botocore.exceptions import HTTPClientError
+
+
+# Calls are retried by the CloudFormationClient and not by botocore, so that the
+# retries and botocore's client-side rate limiter do not add to the TokenBucket's
+CLIENT_CONFIG = Config(retries={'mode': 'standard', 'max_attempts': 1})
+
+THROTTLING_ERROR_CODES = (
+    'Throttling',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+    'TooManyRequestsException',
+)
+
+# Refused credentials are checked with STS and the role is assumed again once
+AUTH_ERROR_CODES = (
+    'ExpiredToken',
+    'InvalidClientTokenId',
+)
+
+TRANSIENT_ERROR_CODES = (
+    'InternalFailure',
+    'InternalError',
+    'ServiceUnavailable',
+    'RequestTimeout',
+    'RequestTimeoutException',
+)
+
+def is_throttling_error(error):
+    "Returns True if a ClientError is an API rate limit error"
+    if error.response['Error']['Code'] in THROTTLING_ERROR_CODES:
+        return True
+    return error.response['Error'].get('Message', '').endswith('Rate exceeded')
+
+
+class TokenBucket():
+    """
+    Token bucket that limits the rate of API calls. The rate is halved each time a call
+    is throttled and grows back towards max_rate as calls succeed.
+    """
+    max_rate = 10.0
+    min_rate = 0.5
+    capacity = 10.0
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rate = self.max_rate
+        self.tokens = self.capacity
+        self.last_time = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_time) * self.rate)
+        self.last_time = now
+
+    def acquire(self):
+        "Block until a token is available"
+        while True:
+            with self.lock:
+                self.refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def throttled(self):
+        with self.lock:
+            self.refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+
+    def succeeded(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + 0.1)
+
+
+class CloudFormationClient():
+    """
+    Wraps a boto3 CloudFormation client. Every API call waits on the TokenBucket for the
+    account and region and is retried with jittered exponential backoff if it is throttled
+    or fails with a transient error. The wrapped client does not retry calls itself.
+    The client's credentials are renewed by the AccountContext before they expire. If they
+    are refused anyway, the call is retried once with a client from a new session.
+    """
+    max_attempts = 10
+    base_delay = 0.5
+    max_delay = 20
+
+    def __init__(self, account_ctx, aws_region, bucket):
+        self.account_ctx = account_ctx
+        self.aws_region = aws_region
+        self.bucket = bucket
+        self.client = None
+
+    def get_client(self, force=False):
+        if self.client == None or force == True:
+            self.client = self.account_ctx.get_aws_client(
+                'cloudformation', self.aws_region, client_config=CLIENT_CONFIG, force=force
+            )
+        return self.client
+
+    def call(self, method_name, *args, **kwargs):
+        attempt = 0
+        force = False
+        auth_retried = False
+        while True:
+            attempt += 1
+            client = self.get_client(force)
+            force = False
+            self.bucket.acquire()
+            try:
+                response = getattr(client, method_name)(*args, **kwargs)
+            except ClientError as e:
+                if e.response['Error']['Code'] in AUTH_ERROR_CODES and auth_retried == False:
+                    # get_session(force=True) checks the credentials and assumes the role again
+                    auth_retried = True
+                    force = True
+                    continue
+                if attempt >= self.max_attempts:
+                    raise
+                if is_throttling_error(e) == True:
+                    self.bucket.throttled()
+                elif e.response['Error']['Code'] not in TRANSIENT_ERROR_CODES:
+                    raise
+                self.backoff(attempt)
+                continue
+            except (BotocoreConnectionError, HTTPClientError):
+                # connection failures and read timeouts
+                if attempt >= self.max_attempts:
+                    raise
+                self.backoff(attempt)
+                continue
+            self.bucket.succeeded()
+            return response
+
+    def backoff(self, attempt):
+        "Sleep for a jittered, exponentially increasing delay before the next attempt"
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        time.sleep(random.uniform(0, delay))
+
+    def __getattr__(self, name):
+        attr = getattr(self.get_client(), name)
+        if name.startswith('get_') and name not in ('get_template', 'get_template_summary', 'get_stack_policy'):
+            # get_paginator and get_waiter return objects which make their own API calls
+            return attr
+        if callable(attr) == False:
+            return attr
+        def api_call(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        return api_call
+
+
+token_buckets = {}
+token_buckets_lock = threading.Lock()
+
+# Maximum number of concurrent validate_template calls for each account and region
+validate_calls_per_region = 4
+validate_semaphores = {}
+validate_semaphores_lock = threading.Lock()
+
+def get_cfn_client(account_ctx, aws_region):
+    "Returns a CloudFormationClient that is rate limited with the other clients for an account and region"
+    bucket_id = account_ctx.get_name() + '.' + aws_region
+    with token_buckets_lock:
+        if bucket_id not in token_buckets:
+            token_buckets[bucket_id] = TokenBucket()
+        bucket = token_buckets[bucket_id]
+    return CloudFormationClient(account_ctx, aws_region, bucket)
+
+def get_validate_semaphore(account_ctx, aws_region):
+    "Semaphore that limits the validate_template calls for an account and region"
+    semaphore_id = account_ctx.get_name() + '.' + aws_region
+    with validate_semaphores_lock:
+        if semaphore_id not in validate_semaphores:
+            validate_semaphores[semaphore_id] = threading.Semaphore(validate_calls_per_region)
+        return validate_semaphores[semaphore_id]
@@ -0,0 +1,214 @@
+"""
+Polls the status of in-flight CloudFormation stacks for an account and region.
+"""
+
+import threading
+from botocore.exceptions import ClientError
+from paco.stack_group.cfn_client import get_cfn_client
+
+
+class StackStatusPoller():
+    """
+    Tracks every in-flight Stack in one account and region. A single background thread
+    sweeps the region with a paginated describe_stacks call and notifies the Stacks that are
+    waiting as they finish. The delay between sweeps starts short and backs off while no
+    watched Stack changes, and resets as soon as a Stack changes or a new Stack is watched.
+
+    The poller also caches the describe_stacks of every Paco Stack in the account and region.
+    The cache is loaded with a single sweep the first time a Stack is looked up. A Stack is
+    removed from the cache with invalidate() when it is changed and is described on it's own
+    the next time it is looked up.
+    """
+    min_delay = 2
+    max_delay = 30
+    backoff = 1.5
+
+    def __init__(self, account_ctx, aws_region):
+        self.account_ctx = account_ctx
+        self.aws_region = aws_region
+        self.condition = threading.Condition()
+        self.watched = {}
+        self.stacks = {}
+        self.error = None
+        self.thread = None
+        self.delay = self.min_delay
+        self.cfn_client = get_cfn_client(account_ctx, aws_region)
+        self.cache_lock = threading.RLock()
+        self.stack_cache = None
+        self.stack_names = None
+
+    def is_complete(self, stack_name):
+        "A Stack has finished once it no longer exists or is not in an _IN_PROGRESS state"
+        if stack_name not in self.stacks:
+            return False
+        stack_describe = self.stacks[stack_name]
+        if stack_describe == None:
+            return True
+        return stack_describe['StackStatus'].endswith('_IN_PROGRESS') == False
+
+    def wait(self, stack_name):
+        """
+        Blocks until a Stack has finished. Returns the describe_stacks dict for the Stack,
+        or None if the Stack no longer exists.
+        """
+        with self.condition:
+            self.watched[stack_name] = self.watched.get(stack_name, 0) + 1
+            self.stacks.pop(stack_name, None)
+            self.delay = self.min_delay
+            if self.thread == None:
+                self.error = None
+            if self.start_thread() == False:
+                # wake the poller to sweep again sooner
+                self.condition.notify_all()
+            try:
+                while self.is_complete(stack_name) == False:
+                    if self.error != None:
+                        raise self.error
+                    self.condition.wait(timeout=self.max_delay)
+                    self.start_thread()
+                return self.stacks[stack_name]
+            finally:
+                self.watched[stack_name] -= 1
+                if self.watched[stack_name] == 0:
+                    del self.watched[stack_name]
+
+    def start_thread(self):
+        """
+        Starts the poller thread if it is not running, or restarts it if it exited without
+        clearing itself. Must be called with the condition held. Returns True if started.
+        """
+        if self.error != None:
+            return False
+        if self.thread != None and self.thread.is_alive():
+            return False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return True
+
+    def describe_stacks(self):
+        "Sweep the region for the status of every Stack"
+        stacks = {}
+        kwargs = {}
+        while True:
+            page = self.cfn_client.describe_stacks(**kwargs)
+            for stack_describe in page['Stacks']:
+                stacks[stack_describe['StackName']] = stack_describe
+            if page.get('NextToken', None) == None:
+                break
+            kwargs['NextToken'] = page['NextToken']
+        return stacks
+
+    def is_paco_stack(self, stack_describe):
+        for tag in stack_describe.get('Tags', []):
+            if tag['Key'] == 'Paco-Stack':
+                return True
+        return False
+
+    def is_cacheable(self, stack_describe):
+        "Stacks that are in progress will change and are always described again"
+        return stack_describe['StackStatus'].endswith('_IN_PROGRESS') == False
+
+    def prefetch(self):
+        "Load the describe_stacks of every Paco Stack in the account and region"
+        with self.cache_lock:
+            if self.stack_cache != None:
+                return
+            stacks = self.describe_stacks()
+            self.stack_names = set(stacks.keys())
+            self.stack_cache = {}
+            for stack_name, stack_describe in stacks.items():
+                if self.is_paco_stack(stack_describe) and self.is_cacheable(stack_describe):
+                    self.stack_cache[stack_name] = stack_describe
+
+    def describe_stack(self, stack_name):
+        "Describe a single Stack. Returns None if the Stack does not exist."
+        try:
+            response = self.cfn_client.describe_stacks(StackName=stack_name)
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ValidationError' and e.response['Error']['Message'].endswith("does not exist"):
+                return None
+            raise
+        return response['Stacks'][0]
+
+    def get_stack(self, stack_name):
+        """
+        Returns the describe_stacks dict for a Stack, or None if the Stack does not exist.
+        Only Stacks that are not in progress are kept in the cache.
+        """
+        with self.cache_lock:
+            self.prefetch()
+            if stack_name in self.stack_cache:
+                return self.stack_cache[stack_name]
+            if stack_name not in self.stack_names:
+                return None
+        stack_describe = self.describe_stack(stack_name)
+        self.update_stack(stack_name, stack_describe)
+        return stack_describe
+
+    def update_stack(self, stack_name, stack_describe):
+        "Cache the describe_stacks of a Stack that has finished"
+        with self.cache_lock:
+            if self.stack_cache == None:
+                return
+            if stack_describe == None:
+                self.stack_names.discard(stack_name)
+                self.stack_cache.pop(stack_name, None)
+            elif self.is_cacheable(stack_describe):
+                self.stack_names.add(stack_name)
+                self.stack_cache[stack_name] = stack_describe
+
+    def invalidate(self, stack_name):
+        "A Stack has been changed and needs to be described again"
+        with self.cache_lock:
+            if self.stack_cache == None:
+                return
+            self.stack_names.add(stack_name)
+            self.stack_cache.pop(stack_name, None)
+
+    def run(self):
+        while True:
+            with self.condition:
+                if len(self.watched) == 0:
+                    self.thread = None
+                    return
+            try:
+                stacks = self.describe_stacks()
+            except Exception as e:
+                # throttling is retried by the CloudFormationClient, any other error
+                # is raised in the waiting threads
+                with self.condition:
+                    self.error = e
+                    self.thread = None
+                    self.condition.notify_all()
+                return
+
+            with self.condition:
+                changed = False
+                for stack_name in self.watched.keys():
+                    stack_describe = stacks.get(stack_name, None)
+                    previous_status = None
+                    if self.stacks.get(stack_name, None) != None:
+                        previous_status = self.stacks[stack_name]['StackStatus']
+                    if stack_name not in self.stacks or stack_describe == None or \
+                        stack_describe['StackStatus'] != previous_status:
+                        changed = True
+                    self.stacks[stack_name] = stack_describe
+                    self.update_stack(stack_name, stack_describe)
+                self.condition.notify_all()
+                if changed:
+                    self.delay = self.min_delay
+                else:
+                    self.delay = min(self.delay * self.backoff, self.max_delay)
+                self.condition.wait(timeout=self.delay)
+
+
+stack_pollers = {}
+stack_pollers_lock = threading.Lock()
+
+def get_stack_poller(account_ctx, aws_region):
+    "Returns the StackStatusPoller shared by every Stack in an account and region"
+    poller_id = account_ctx.get_name() + '.' + aws_region
+    with stack_pollers_lock:
+        if poller_id not in stack_pollers:
+            stack_pollers[poller_id] = StackStatusPoller(account_ctx, aws_region)
+        return stack_pollers[poller_id]
@@ -0,0 +1,249 @@
+"""
+Schedules Stack actions concurrently based on the dependencies between Stacks.
+"""
+
+import concurrent.futures
+from paco import utils
+from paco.core.exception import StackException, PacoErrorCode
+from paco.models.references import get_model_obj_from_ref
+from paco.stack_group.stack_group import StackGroup, StackOrder
+
+
+def get_resource_ref(config_ref):
+    """
+    Returns the config_ref of the Resource that a Stack config_ref belongs to.
+    Stacks created for the same Resource, such as an IAM Role and the Resource
+    that uses it, share a Resource ref.
+    """
+    parts = config_ref.split('.')
+    if 'resources' in parts:
+        idx = parts.index('resources')
+        return '.'.join(parts[:idx+2])
+    return config_ref
+
+
+class StackNode():
+    "A Stack in the dependency graph of a StackScheduler"
+
+    def __init__(self, stack, stack_group, index):
+        self.stack = stack
+        self.stack_group = stack_group
+        self.index = index
+        self.orders = []
+        self.depends_on = []
+        self.dependents = []
+
+    def add_dependency(self, node):
+        if node == self or node in self.depends_on:
+            return
+        self.depends_on.append(node)
+        node.dependents.append(self)
+
+    @property
+    def needs_wait(self):
+        "Stacks are waited upon if their StackOrder asks for it or if other Stacks depend upon them"
+        if StackOrder.WAIT in self.orders or StackOrder.WAITLAST in self.orders:
+            return True
+        return len(self.dependents) > 0
+
+
+class StackScheduler():
+    """
+    Provisions or deletes the Stacks in a StackGroup, and any nested StackGroups, concurrently.
+
+    A dependency graph is built from each template's StackOutputParam parameters and
+    set_dependency() links. Stacks created for the same Resource keep the order in which
+    they were added to the StackGroup and a Stack also depends upon the Resources which
+    are referenced from it's model. A Stack is started as soon as every Stack it depends
+    upon is complete, with at most max_workers Stacks being worked on at once.
+
+    Stacks are deleted in the reverse order: a Stack is deleted as soon as every Stack that
+    depends upon it has been deleted.
+
+    Stacks are validated without regard to their dependencies. Changes to templates are
+    confirmed once every Stack has been validated, in the order the Stacks were added.
+    """
+    def __init__(self, stack_group, max_workers):
+        self.stack_group = stack_group
+        self.paco_ctx = stack_group.paco_ctx
+        self.max_workers = max_workers
+        self.nodes = []
+        self.node_map = {}
+        self.add_stack_nodes(stack_group)
+        self.init_dependencies()
+
+    def add_stack_nodes(self, stack_group):
+        "Add a StackNode for every Stack in a StackGroup in the order they were added"
+        for order_item in stack_group.stack_orders:
+            if isinstance(order_item.stack, StackGroup):
+                if order_item.order == StackOrder.PROVISION:
+                    self.add_stack_nodes(order_item.stack)
+                continue
+            stack = order_item.stack
+            if stack not in self.node_map:
+                node = StackNode(stack, stack_group, len(self.nodes))
+                self.nodes.append(node)
+                self.node_map[stack] = node
+            self.node_map[stack].orders.append(order_item.order)
+
+    def get_referenced_resource_refs(self, resource_ref):
+        "Paco references used by the model of a Resource"
+        try:
+            model_obj = get_model_obj_from_ref('paco.ref ' + resource_ref, self.paco_ctx.project)
+        except Exception:
+            # Not all config_refs have a model object, such as Outputs for a netenv
+            return []
+        return [ref.split(' ', 1)[1] for ref in utils.get_model_refs(model_obj)]
+
+    def init_dependencies(self):
+        "Build the dependency graph"
+        resource_nodes = {}
+        for node in self.nodes:
+            config_ref = node.stack.template.config_ref
+            if config_ref == None or config_ref == '':
+                continue
+            resource_ref = get_resource_ref(config_ref)
+            # Stacks for the same Resource keep their order
+            if resource_ref in resource_nodes:
+                node.add_dependency(resource_nodes[resource_ref][-1])
+            else:
+                resource_nodes[resource_ref] = []
+            resource_nodes[resource_ref].append(node)
+
+        for node in self.nodes:
+            # StackOutputParams and set_dependency() links
+            for stack in node.stack.get_dependencies():
+                # Stacks outside of this StackGroup are provisioned by an earlier StackGroup
+                if stack in self.node_map:
+                    node.add_dependency(self.node_map[stack])
+
+        # Resources referenced from a Resource's model
+        for resource_ref, nodes in resource_nodes.items():
+            for ref in self.get_referenced_resource_refs(resource_ref):
+                ref_resource_ref = get_resource_ref(ref)
+                if ref_resource_ref == resource_ref or ref_resource_ref not in resource_nodes:
+                    continue
+                for ref_node in resource_nodes[ref_resource_ref]:
+                    # Resources can reference each other, only the Stacks added earlier
+                    # to the StackGroup are depended upon to avoid circular dependencies
+                    if ref_node.index > nodes[0].index:
+                        continue
+                    config_ref = ref_node.stack.template.config_ref
+                    if ref == config_ref or ref.startswith(config_ref + '.') or config_ref.startswith(ref + '.'):
+                        nodes[0].add_dependency(ref_node)
+
+    def provision_node(self, node):
+        "Provision a Stack and wait for it to complete"
+        stack = node.stack
+        stack.provision()
+        if node.needs_wait and stack.cached == False:
+            stack.wait_for_complete(verbose=False)
+
+    def delete_node(self, node):
+        "Delete a Stack and wait for the delete to complete"
+        stack = node.stack
+        stack.delete()
+        stack.wait_for_complete(verbose=False)
+
+    def validate_node(self, node):
+        "Generate and validate a template, returns the changes to the applied template"
+        return node.stack.template.validate(confirm_changes=False)
+
+    def run(self, action_method, reverse=False):
+        """
+        Runs action_method for every StackNode, starting each node once it's dependencies
+        are complete. If reverse is True, a node is started once it's dependents are complete.
+        If an action fails, no new actions are started, actions that are already running are
+        allowed to finish and the first error is raised.
+        """
+        remaining = {}
+        ready = []
+        for node in self.nodes:
+            if reverse == True:
+                remaining[node] = len(node.dependents)
+            else:
+                remaining[node] = len(node.depends_on)
+            if remaining[node] == 0:
+                ready.append(node)
+        ready.sort(key=lambda node: node.index, reverse=reverse)
+        completed = []
+        errors = []
+        running = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while len(running) > 0 or (len(ready) > 0 and len(errors) == 0):
+                while len(ready) > 0 and len(errors) == 0:
+                    node = ready.pop(0)
+                    if node.stack_group.is_stack_filtered(node.stack):
+                        node.stack.log_action(action_method.__name__.split('_')[0].capitalize(), 'Filtered')
+                        future = concurrent.futures.Future()
+                        future.set_result(None)
+                    else:
+                        future = executor.submit(action_method, node)
+                    running[future] = node
+                done, _ = concurrent.futures.wait(
+                    running.keys(),
+                    return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    node = running.pop(future)
+                    error = future.exception()
+                    if error != None:
+                        errors.append(error)
+                        continue
+                    completed.append(node)
+                    if reverse == True:
+                        next_nodes = node.depends_on
+                    else:
+                        next_nodes = node.dependents
+                    for next_node in next_nodes:
+                        remaining[next_node] -= 1
+                        if remaining[next_node] == 0:
+                            ready.append(next_node)
+                # Start Stacks in the order they were added to the StackGroup,
+                # or the reverse order when deleting
+                ready.sort(key=lambda node: node.index, reverse=reverse)
+
+        if len(errors) > 0:
+            raise errors[0]
+        if len(completed) != len(self.nodes):
+            message = "StackGroup: {}\n".format(self.stack_group.name)
+            message += "Error: Circular dependency between Stacks:\n"
+            for node in self.nodes:
+                if node not in completed:
+                    message += "  {}\n".format(node.stack.get_name())
+            raise StackException(PacoErrorCode.Unknown, message=message)
+
+    def provision(self):
+        self.run(self.provision_node)
+
+    def validate(self):
+        """
+        Validate every Stack concurrently. Validation errors from all Stacks are reported
+        together and template changes are confirmed in the order the Stacks were added.
+        """
+        futures = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for node in self.nodes:
+                if node.stack_group.is_stack_filtered(node.stack):
+                    node.stack.log_action('Validate', 'Filtered')
+                    continue
+                futures[node] = executor.submit(self.validate_node, node)
+
+        message = ""
+        for node, future in futures.items():
+            error = future.exception()
+            if error == None:
+                continue
+            if isinstance(error, StackException) == False or error.message == None:
+                raise error
+            message += error.message + "\n"
+        if message != "":
+            raise StackException(PacoErrorCode.TemplateValidationError, message=message)
+
+        for node, future in futures.items():
+            deep_diff = future.result()
+            if deep_diff != None:
+                node.stack.template.confirm_template_changes(deep_diff)
+
+    def delete(self):
+        self.run(self.delete_node, reverse=True)
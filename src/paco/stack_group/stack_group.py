@@ -2,20 +2,26 @@ import boto3
 import os
 import pathlib
 import sys
+import threading
 import time
 from paco import utils
 from paco.core.exception import StackException
 from paco.core.exception import PacoException, PacoErrorCode
-from botocore.exceptions import ClientError, WaiterError
+from botocore.exceptions import ClientError
 from enum import Enum
-from paco.core.yaml import YAML
+from paco.core.yaml import YAML, fast_yaml
+from paco.stack_group.cfn_client import get_cfn_client
+from paco.stack_group.poller import get_stack_poller
+from paco.stack_group.stack_store import get_stack_store
 from paco.utils import md5sum, dict_of_dicts_merge
 from copy import deepcopy
 
 log_next_header = None
 
+# tags are hashed into cache ids, so they are always dumped with the pure-Python emitter
 yaml=YAML(typ="safe", pure=True)
 yaml.default_flow_sytle = False
+state_yaml = fast_yaml()
 
 StackEnum = Enum('StackEnum', 'vpc segment')
 
@@ -23,45 +29,6 @@ StackStatus = Enum('StackStatus', 'NONE DOES_NOT_EXIST CREATE_IN_PROGRESS CREATE
 
 StackOrder = Enum('StackOrder', 'PROVISION WAIT WAITLAST')
 
-class StackOutputsManager():
-    def __init__(self):
-        self.outputs_path = {}
-        self.outputs_dict = {}
-
-    def load(self, project_folder, key):
-        self.outputs_path[key] = pathlib.Path(
-            os.path.join(
-                project_folder,
-                'Outputs',
-                key+'.yaml'
-            ))
-        if self.outputs_path[key].exists():
-            with open(self.outputs_path[key], "r") as output_fd:
-                self.outputs_dict[key] = yaml.load(output_fd)
-        else:
-            self.outputs_dict[key] = {}
-
-    def save(self, key):
-        if self.outputs_path[key] == None:
-            raise StackException(PacoErrorCode.Unknown, message="Outputs file has not been loaded.")
-
-        self.outputs_path[key].parent.mkdir(parents=True, exist_ok=True)
-
-        with open(self.outputs_path[key], "w") as output_fd:
-            yaml.dump(self.outputs_dict[key], output_fd)
-
-    def add(self, project_folder, new_outputs_dict):
-        if len(new_outputs_dict.keys()) > 1:
-            raise StackException(PacoErrorCode.Unknown, message="Outputs dict should only have one key. Investigate!")
-        if len(new_outputs_dict.keys()) == 0:
-            return
-        key = list(new_outputs_dict.keys())[0]
-        self.load(project_folder, key)
-        self.outputs_dict[key] = dict_of_dicts_merge(self.outputs_dict[key], new_outputs_dict)
-        self.save(key)
-
-stack_outputs_manager = StackOutputsManager()
-
 class StackTags():
     def __init__(self, stack_tags=None):
         if stack_tags != None:
@@ -205,6 +172,9 @@ class Stack():
 
         self.outputs_value_cache = {}
         self.singleton = False
+        # Stacks which must be complete before this Stack can be provisioned
+        # that can not be discovered from the template's Parameters
+        self.dependencies = []
 
         if hooks == None:
             self.hooks = StackHooks(self.paco_ctx)
@@ -225,26 +195,26 @@ class Stack():
         return self.template.get_yaml_path() + ".output"
     @property
     def cfn_client(self):
+        "Rate limited CloudFormation client shared by the Stacks in this account and region"
         if hasattr(self, '_cfn_client') == False:
-            force = False
-            if hasattr(self, "_cfn_client_expired") and self._cfn_client_expired == True:
-                force = True
-                self._cfn_client_expired = False
-            self._cfn_client = self.account_ctx.get_aws_client('cloudformation', self.aws_region, force=force)
+            self._cfn_client = get_cfn_client(self.account_ctx, self.aws_region)
         return self._cfn_client
 
+    @property
+    def store(self):
+        "StackStore for the project"
+        return get_stack_store(self.paco_ctx)
+
+    @property
+    def store_key(self):
+        "Key of the Stack in the StackStore"
+        return os.path.relpath(self.template.get_yaml_path(), self.paco_ctx.home)
+
+    @property
+    def poller(self):
+        "StackStatusPoller shared by the Stacks in this account and region"
+        return get_stack_poller(self.account_ctx, self.aws_region)
 
-    #--------------------------------------------------------
-    # Resets the client handler to force a session reload.
-    # location is used for debugging to help identify the
-    # places where token expiry was failing.
-    def handle_token_expired(self, location=''):
-        if hasattr(self, '_cfn_client') == True:
-            delattr(self, '_cfn_client')
-        self._cfn_client_expired = True
-        if location != '':
-            location = '_'+location
-        self.log_action("Token", "Retry"+location, "Expired")
 
     def set_template(self, template):
         self.template = template
@@ -253,6 +223,30 @@ class Stack():
     def add_hooks(self, hooks):
         self.hooks.merge(hooks)
 
+    def add_dependency(self, stack):
+        "Explicitly make this Stack depend upon another Stack"
+        if stack not in self.dependencies:
+            self.dependencies.append(stack)
+
+    def get_dependencies(self):
+        """
+        Returns a list of Stacks that this Stack depends upon. These are gathered
+        from the StackOutputParam entries of the template's Parameters, the template
+        set with set_dependency() and any Stacks added with add_dependency().
+        """
+        dependencies = []
+        for param_entry in self.template.parameters:
+            for entry in getattr(param_entry, 'entry_list', []):
+                dependencies.append(entry['stack'])
+        if self.template.dependency_template != None:
+            dependencies.append(self.template.dependency_template.stack)
+        dependencies.extend(self.dependencies)
+        unique_dependencies = []
+        for stack in dependencies:
+            if stack != None and stack != self and stack not in unique_dependencies:
+                unique_dependencies.append(stack)
+        return unique_dependencies
+
     def set_termination_protection(self, protection_enabled):
         self.termination_protection = protection_enabled
 
@@ -292,33 +286,20 @@ class Stack():
         self.template.validate()
 
     def get_status(self):
-        while True:
-            try:
-                stack_list = self.cfn_client.describe_stacks(StackName=self.get_name())
-            except ClientError as e:
-                if e.response['Error']['Code'] == 'ValidationError' and e.response['Error']['Message'].endswith("does not exist"):
-                    self.status = StackStatus.DOES_NOT_EXIST
-                elif e.response['Error']['Code'] == 'ClientError' and e.response['Error']['Message'].endswith("Rate exceeded"):
-                    # Lets try again in a little bit
-                    msg_prefix = self.log_action("Provision", "Warning", return_it=True)
-                    print(msg_prefix+": Get Status throttled")
-                    time.sleep(1)
-                    continue
-                elif e.response['Error']['Code'] == 'ExpiredToken':
-                    self.handle_token_expired()
-                    continue
-                else:
-                    message = self.get_stack_error_message(
-                        prefix_message=e.response['Error']['Message'],
-                        skip_status = True
-                    )
-                    raise StackException(PacoErrorCode.Unknown, message=message)
-            else:
-                self.status = StackStatus[stack_list['Stacks'][0]['StackStatus']]
-                self.stack_id = stack_list['Stacks'][0]['StackId']
-                self.cfn_stack_describe = stack_list['Stacks'][0]
-
-            break
+        try:
+            stack_describe = self.poller.get_stack(self.get_name())
+        except ClientError as e:
+            message = self.get_stack_error_message(
+                prefix_message=e.response['Error']['Message'],
+                skip_status = True
+            )
+            raise StackException(PacoErrorCode.Unknown, message=message)
+        if stack_describe == None:
+            self.status = StackStatus.DOES_NOT_EXIST
+        else:
+            self.status = StackStatus[stack_describe['StackStatus']]
+            self.stack_id = stack_describe['StackId']
+            self.cfn_stack_describe = stack_describe
 
     def is_creating(self):
         if self.status == StackStatus.CREATE_IN_PROGRESS:
@@ -356,21 +337,16 @@ class Stack():
         if key in self.outputs_value_cache.keys():
             return self.outputs_value_cache[key]
 
-        while True:
-            try:
-                stack_metadata = self.cfn_client.describe_stacks(StackName=self.get_name())
-            except ClientError as e:
-                if e.response['Error']['Code'] == 'ValidationError' and e.response['Error']['Message'].find("does not exist") != -1:
-                    message = self.get_stack_error_message()
-                    message += 'Could not describe stack to get value for Outputs Key: {}\n'.format(key)
-                    message += 'Account: ' + self.account_ctx.get_name()
-                    raise StackException(PacoErrorCode.StackDoesNotExist, message = message)
-                elif e.response['Error']['Code'] == 'ExpiredToken':
-                    self.handle_token_expired()
-                    continue
-                else:
-                    raise StackException(PacoErrorCode.Unknown, message=e.response['Error']['Message'])
-            break
+        try:
+            stack_describe = self.poller.get_stack(self.get_name())
+        except ClientError as e:
+            raise StackException(PacoErrorCode.Unknown, message=e.response['Error']['Message'])
+        if stack_describe == None:
+            message = self.get_stack_error_message()
+            message += 'Could not describe stack to get value for Outputs Key: {}\n'.format(key)
+            message += 'Account: ' + self.account_ctx.get_name()
+            raise StackException(PacoErrorCode.StackDoesNotExist, message = message)
+        stack_metadata = {'Stacks': [stack_describe]}
 
         if 'Outputs' not in stack_metadata['Stacks'][0].keys():
             message = self.get_stack_error_message()
@@ -393,6 +369,31 @@ class Stack():
             message=message
         )
 
+    def get_local_outputs_value(self, key):
+        """
+        Returns the value of a Stack Output saved locally when the Stack was last provisioned,
+        or None if the value was not saved. Values are read from the Stack's .output file and
+        then the outputs of all Stacks saved for the same Outputs/*.yaml file.
+        """
+        if key in self.outputs_value_cache.keys():
+            return self.outputs_value_cache[key]
+        if self.output_config_dict == None:
+            self.output_config_dict = self.store.get_outputs(self.store_key, legacy_path=self.output_filename)
+        for output_config in self.template.stack_output_config_list:
+            if output_config.key != key:
+                continue
+            ref_part_list = output_config.config_ref.split('.')
+            for outputs_dict in (self.output_config_dict, self.store.get_outputs_by_key(ref_part_list[0])):
+                value = outputs_dict
+                for ref_part in ref_part_list:
+                    if isinstance(value, dict) == False or ref_part not in value:
+                        value = None
+                        break
+                    value = value[ref_part]
+                if isinstance(value, dict) and '__name__' in value:
+                    return value['__name__']
+        return None
+
     def get_outputs_key_from_ref(self, ref):
 
         key = self.template.get_outputs_key_from_ref(ref)
@@ -404,9 +405,9 @@ class Stack():
                 message=message)
         return key
 
-    def gen_cache_id(self):
+    def gen_cache_id(self, local=False):
         # CloudFormation Template
-        new_cache_id = self.template.gen_cache_id()
+        new_cache_id = self.template.gen_cache_id(local=local)
         if new_cache_id == None:
             return None
         # Termination Protection toggle
@@ -432,7 +433,8 @@ class Stack():
             else:
                 return False
         try:
-            new_cache_id = self.gen_cache_id()
+            # Upstream stack outputs are read from local files unless --refresh is used
+            new_cache_id = self.gen_cache_id(local=(self.paco_ctx.refresh == False))
         except PacoException as e:
             if e.code == PacoErrorCode.StackDoesNotExist:
                 return False
@@ -444,19 +446,12 @@ class Stack():
         if new_cache_id == None:
             return False
 
-        cache_id = "none"
-        if os.path.isfile(self.cache_filename):
-            with open(self.cache_filename, "r") as cache_fd:
-                cache_id = cache_fd.read()
+        cache_id = self.store.get_cache_id(self.store_key, legacy_path=self.cache_filename)
 
         if cache_id == new_cache_id:
             self.cached = True
             # Load Stack Outputs
-            try:
-                with open(self.output_filename, "r") as output_fd:
-                    self.output_config_dict = yaml.load(output_fd)
-            except FileNotFoundError:
-                pass
+            self.output_config_dict = self.store.get_outputs(self.store_key, legacy_path=self.output_filename)
             return True
 
 
@@ -464,14 +459,9 @@ class Stack():
 
     def save_stack_outputs(self):
         self.output_config_dict = self.template.process_stack_output_config(self)
-
-        with open(self.output_filename, "w") as output_fd:
-            yaml.dump(
-                data=self.output_config_dict,
-                stream=output_fd
-            )
-
-        stack_outputs_manager.add(self.paco_ctx.home, self.output_config_dict)
+        if len(self.output_config_dict.keys()) > 1:
+            raise StackException(PacoErrorCode.Unknown, message="Outputs dict should only have one key. Investigate!")
+        self.store.set_outputs(self.store_key, self.output_config_dict)
 
     # Actions to perform when a stack has been successfully created or updated
     def stack_success(self):
@@ -479,8 +469,7 @@ class Stack():
             # Create cache file
             new_cache_id = self.gen_cache_id()
             if new_cache_id != None:
-                with open(self.cache_filename, "w") as cache_fd:
-                    cache_fd.write(new_cache_id)
+                self.store.set_cache_id(self.store_key, new_cache_id)
 
             # Save stack outputs to yaml
             self.save_stack_outputs()
@@ -514,6 +503,7 @@ class Stack():
             # EnableTerminationProtection=False
         )
         self.stack_id = response['StackId']
+        self.poller.invalidate(self.get_name())
 
         self.cfn_client.update_termination_protection(
             EnableTerminationProtection=True,
@@ -527,8 +517,10 @@ class Stack():
             return
         self.action = "update"
         stack_parameters = self.template.generate_stack_parameters(action=self.action)
-        self.template.confirm_stack_parameter_changes(stack_parameters)
-        self.template.validate_template_changes()
+        # Only one Stack at a time can display changes and prompt for confirmation
+        with self.paco_ctx.interactive_lock:
+            self.template.confirm_stack_parameter_changes(stack_parameters)
+            self.template.validate_template_changes()
         self.log_action("Provision", "Update")
 
         if True == False and self.paco_ctx.yes == False:
@@ -539,45 +531,42 @@ class Stack():
                 return
 
         self.hooks.run("update", "pre", self)
-        while True:
-            try:
-                self.cfn_client.update_stack(
-                    StackName=self.get_name(),
-                    TemplateBody=self.template.body,
-                    Parameters=stack_parameters,
-                    Capabilities=self.template.capabilities,
-                    UsePreviousTemplate=False,
-                    Tags=self.tags.cf_list()
-                )
-            except ClientError as e:
-                if e.response['Error']['Code'] == 'ValidationError':
-                    success = False
-                    if e.response['Error']['Message'].endswith("No updates are to be performed."):
-                        success = True
-                    elif e.response['Error']['Message'].endswith("is in UPDATE_COMPLETE_CLEANUP_IN_PROGRESS state and can not be updated."):
-                        success = True
-
-                    if success == True:
-                        self.log_action("Provision", "Done")
-                        self.stack_success()
-                    else:
-                        message = self.get_stack_error_message()
-                        message += "ValidationError: {}\n".format(e.response['Error']['Message'])
-                        raise StackException(PacoErrorCode.Unknown, message = message)
-                elif e.response['Error']['Code'] == 'ExpiredToken':
-                    self.handle_token_expired()
-                    continue
+        try:
+            self.cfn_client.update_stack(
+                StackName=self.get_name(),
+                TemplateBody=self.template.body,
+                Parameters=stack_parameters,
+                Capabilities=self.template.capabilities,
+                UsePreviousTemplate=False,
+                Tags=self.tags.cf_list()
+            )
+            self.poller.invalidate(self.get_name())
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ValidationError':
+                success = False
+                if e.response['Error']['Message'].endswith("No updates are to be performed."):
+                    success = True
+                elif e.response['Error']['Message'].endswith("is in UPDATE_COMPLETE_CLEANUP_IN_PROGRESS state and can not be updated."):
+                    success = True
+
+                if success == True:
+                    self.log_action("Provision", "Done")
+                    self.stack_success()
                 else:
-                    #message = "Stack: {}\nError: {}\n".format(self.get_name(), e.response['Error']['Message'])
                     message = self.get_stack_error_message()
+                    message += "ValidationError: {}\n".format(e.response['Error']['Message'])
                     raise StackException(PacoErrorCode.Unknown, message = message)
-            break
+            else:
+                #message = "Stack: {}\nError: {}\n".format(self.get_name(), e.response['Error']['Message'])
+                message = self.get_stack_error_message()
+                raise StackException(PacoErrorCode.Unknown, message = message)
 
         if self.cfn_stack_describe['EnableTerminationProtection'] == False:
             self.cfn_client.update_termination_protection(
                 EnableTerminationProtection=True,
                 StackName=self.get_name()
             )
+            self.poller.invalidate(self.get_name())
 
     def delete_stack(self):
         if self.change_protected == True:
@@ -588,21 +577,24 @@ class Stack():
         if self.is_exists() == True:
             # Delete Stack
             if self.termination_protection == True:
-                print("\nThis Stack has Termination Protection enabled!")
-                print("Stack Name: {}\n".format(self.get_name()))
-                answer = self.paco_ctx.input_confirm_action("Destroy this stack forever?")
-                if answer == False:
-                    print("Destruction aborted. Allowing stack to exist.")
-                    return
+                with self.paco_ctx.interactive_lock:
+                    print("\nThis Stack has Termination Protection enabled!")
+                    print("Stack Name: {}\n".format(self.get_name()))
+                    answer = self.paco_ctx.input_confirm_action("Destroy this stack forever?")
+                    if answer == False:
+                        print("Destruction aborted. Allowing stack to exist.")
+                        return
             if self.is_deleting() == False:
                 self.cfn_client.update_termination_protection(
                     EnableTerminationProtection=False,
                     StackName=self.get_name()
                 )
+                self.poller.invalidate(self.get_name())
         self.log_action("Delete", "Stack")
         self.hooks.run("delete", "pre", self)
         if self.is_exists() == True:
             self.cfn_client.delete_stack( StackName=self.get_name() )
+            self.poller.invalidate(self.get_name())
             if self.wait_for_delete == True:
                 self.wait_for_complete()
 
@@ -623,17 +615,7 @@ class Stack():
             message += "--------- {}  -------------\n".format(
                 ' '*(col_size-len('LogicalId '))
             )
-            while True:
-                try:
-                    stack_events = self.cfn_client.describe_stack_events(StackName=self.get_name())
-                except ClientError as exc:
-                    if exc.response['Error']['Code'] == 'ExpiredToken':
-                        self.handle_token_expired('4')
-                        continue
-                    else:
-                        raise sys.exc_info()
-                break
-
+            stack_events = self.cfn_client.describe_stack_events(StackName=self.get_name())
 
             for stack_event in stack_events['StackEvents']:
                 if stack_event['ResourceStatus'].find('FAILED') != -1:
@@ -660,14 +642,15 @@ class Stack():
 
         self.get_status()
         if self.is_failed():
-            print("--------------------------------------------------------")
-            self.log_action("Provision", "Failed")
-            print("The stack is in a '{}' state.".format(self.status))
-            stack_message = self.get_stack_error_message(skip_status=True)
-            print(stack_message)
-            print("--------------------------------------------------------")
-            answer = self.paco_ctx.input_confirm_action("\nDelete it?", default='y')
-            print('')
+            with self.paco_ctx.interactive_lock:
+                print("--------------------------------------------------------")
+                self.log_action("Provision", "Failed")
+                print("The stack is in a '{}' state.".format(self.status))
+                stack_message = self.get_stack_error_message(skip_status=True)
+                print(stack_message)
+                print("--------------------------------------------------------")
+                answer = self.paco_ctx.input_confirm_action("\nDelete it?", default='y')
+                print('')
             if answer:
                 self.delete()
                 self.wait_for_complete()
@@ -700,6 +683,8 @@ class Stack():
             return
         self.template.delete()
         self.delete_stack()
+        self.store.delete(self.store_key)
+        # Files written by earlier versions of Paco
         utils.log_action('Delete', 'Stack', 'Cache', self.cache_filename)
         try:
             os.remove(self.cache_filename)
@@ -754,62 +739,68 @@ class Stack():
             return log_message
 
     def wait_for_complete(self, verbose=False):
-        # While loop to handle expired token retries
-        while True:
-            if self.action == None:
-                return
-            self.get_status()
-            waiter = None
-            action_name = "Provision"
-            if self.is_updating():
-                if verbose:
-                    self.log_action("Provision", "Update")
-                waiter = self.cfn_client.get_waiter('stack_update_complete')
-            elif self.is_creating():
-                if verbose:
-                    self.log_action("Provision", "Create")
-                waiter = self.cfn_client.get_waiter('stack_create_complete')
-            elif self.is_deleting():
-                if verbose:
-                    self.log_action("Delete", "Stack")
-                action_name = "Delete"
-                waiter = self.cfn_client.get_waiter('stack_delete_complete')
-            elif self.is_complete():
-                pass
-            elif not self.is_exists():
-                pass
+        if self.action == None:
+            return
+        self.get_status()
+        wait_status = None
+        action_name = "Provision"
+        if self.is_updating():
+            if verbose:
+                self.log_action("Provision", "Update")
+            wait_status = [StackStatus.UPDATE_COMPLETE]
+        elif self.is_creating():
+            if verbose:
+                self.log_action("Provision", "Create")
+            wait_status = [StackStatus.CREATE_COMPLETE]
+        elif self.is_deleting():
+            if verbose:
+                self.log_action("Delete", "Stack")
+            action_name = "Delete"
+            wait_status = [StackStatus.DELETE_COMPLETE, StackStatus.DOES_NOT_EXIST]
+        elif self.is_complete():
+            pass
+        elif not self.is_exists():
+            pass
+        else:
+            message = self.get_stack_error_message()
+            raise StackException(
+                PacoErrorCode.WaiterError,
+                message=message
+            )
+
+        if wait_status != None:
+            self.log_action(action_name, "Wait")
+            try:
+                stack_describe = self.poller.wait(self.get_name())
+            except ClientError as e:
+                self.log_action(action_name, "Error")
+                message = "Waiter Error:  {}\n".format(e)
+                message += self.get_stack_error_message(message)
+                raise StackException(PacoErrorCode.WaiterError, message = message)
+            if stack_describe == None:
+                self.status = StackStatus.DOES_NOT_EXIST
             else:
-                message = self.get_stack_error_message()
-                raise StackException(
-                    PacoErrorCode.WaiterError,
-                    message=message
-                )
+                self.status = StackStatus[stack_describe['StackStatus']]
+                self.stack_id = stack_describe['StackId']
+                self.cfn_stack_describe = stack_describe
+            if self.action != "delete":
+                self.store.set_status(self.store_key, self.status.name)
+            if self.status not in wait_status:
+                self.log_action(action_name, "Error")
+                message = "Waiter Error:  Stack finished with status {}\n".format(self.status.name)
+                message += self.get_stack_error_message(message)
+                raise StackException(PacoErrorCode.WaiterError, message = message)
+            self.log_action(action_name, "Done")
+
+        if self.is_exists():
+            self.stack_success()
 
-            if waiter != None:
-                self.log_action(action_name, "Wait")
-                try:
-                    waiter.wait(StackName=self.get_name())
-                except WaiterError as waiter_exception:
-                    if str(waiter_exception).find('The security token included in the request is expired') != -1:
-                        self.handle_token_expired()
-                        continue
-                    self.log_action(action_name, "Error")
-                    message = "Waiter Error:  {}\n".format(waiter_exception)
-                    message += self.get_stack_error_message(message)
-                    raise StackException(PacoErrorCode.WaiterError, message = message)
-                self.log_action(action_name, "Done")
-
-            if self.is_exists():
-                self.stack_success()
-
-            if self.action == "create":
-                self.hooks.run("create", "post", self)
-            elif self.action == "update":
-                self.hooks.run("update", "post", self)
-            elif self.action == "delete":
-                self.hooks.run("delete", "post", self)
-
-            break
+        if self.action == "create":
+            self.hooks.run("create", "post", self)
+        elif self.action == "update":
+            self.hooks.run("update", "post", self)
+        elif self.action == "delete":
+            self.hooks.run("delete", "post", self)
 
 class StackGroup():
     def __init__(
@@ -858,7 +849,7 @@ class StackGroup():
         if os.path.isfile(self.state_filepath) == False:
             return self.new_state()
         with open(self.state_filepath, "r") as stream:
-            state = yaml.load(stream)
+            state = state_yaml.load(stream)
         if state == None:
             return self.new_state()
         return state
@@ -902,26 +893,37 @@ class StackGroup():
                     # TODO: Wait for the stacks
 
         with open(self.state_filepath, "w") as output_fd:
-                yaml.dump(  data=new_state,
+                state_yaml.dump(  data=new_state,
                             stream=output_fd)
 
+    def is_stack_filtered(self, stack):
+        "Returns True if the Stack is outside of the scope of the stack group filter"
+        if self.filter_config == None:
+            return False
+        # Exact match or append '.' otherwise we might match
+        # foo.bar wtih foo.bar_bad
+        if stack.template.config_ref == self.filter_config or \
+            stack.template.config_ref.startswith(self.filter_config+'.') or \
+            stack.singleton:
+            return False
+        return True
+
     def filtered_stack_action(self, stack, action_method):
-        if self.filter_config != None:
-            # Exact match or append '.' otherwise we might match
-            # foo.bar wtih foo.bar_bad
-            if stack.template.config_ref == self.filter_config or \
-                stack.template.config_ref.startswith(self.filter_config+'.') or \
-                stack.singleton:
-                action_method()
-            else:
-                stack.log_action(
-                    action_method.__func__.__name__.capitalize(),
-                    'Filtered'
-                )
-        else:
+        if self.is_stack_filtered(stack) == False:
             action_method()
+        else:
+            stack.log_action(
+                action_method.__func__.__name__.capitalize(),
+                'Filtered'
+            )
 
     def validate(self):
+        if self.paco_ctx.max_workers > 1:
+            # Validate stacks concurrently
+            from paco.stack_group.scheduler import StackScheduler
+            StackScheduler(self, self.paco_ctx.max_workers).validate()
+            return
+
         # Loop through stacks and validate each
         for order_item in self.stack_orders:
             if order_item.order == StackOrder.PROVISION:
@@ -934,6 +936,19 @@ class StackGroup():
                     )
 
     def provision(self):
+        try:
+            self.provision_stacks()
+        finally:
+            # Write the Outputs/*.yaml files for stacks that have changed
+            get_stack_store(self.paco_ctx).export()
+
+    def provision_stacks(self):
+        if self.paco_ctx.max_workers > 1:
+            # Provision independent stacks concurrently
+            from paco.stack_group.scheduler import StackScheduler
+            StackScheduler(self, self.paco_ctx.max_workers).provision()
+            return
+
         # Loop through stacks and provision each one
         wait_last_list = []
         for order_item in self.stack_orders:
@@ -965,6 +980,12 @@ class StackGroup():
         # self.update_state()
 
     def delete(self):
+        if self.paco_ctx.max_workers > 1:
+            # Delete independent stacks concurrently
+            from paco.stack_group.scheduler import StackScheduler
+            StackScheduler(self, self.paco_ctx.max_workers).delete()
+            return
+
         # Loop through stacks and deletes each one
         for order_item in reversed(self.stack_orders):
             if order_item.order == StackOrder.PROVISION:
@@ -0,0 +1,220 @@
+"""
+Local store for the state of a project's CloudFormation stacks.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+from paco.core.yaml import fast_yaml
+from paco.utils import dict_of_dicts_merge
+
+yaml = fast_yaml()
+yaml.allow_duplicate_keys = True
+
+STORE_COLUMNS = ('cache_id', 'outputs_key', 'outputs', 'parameters', 'status')
+
+
+class StackStore():
+    """
+    Stores the cache id, outputs, applied parameters and status of every Stack in
+    a SQLite database in the project's build folder. Stacks are keyed by the path of
+    their template relative to the Paco project.
+
+    Each change is made in it's own transaction and the store can be shared by Stacks
+    that are provisioned concurrently. If a Stack is not in the store, the files written by
+    earlier versions of Paco are read instead. The Outputs/<key>.yaml files used to resolve
+    references to stack outputs are written by export().
+
+    Template bodies that have passed CloudFormation validation are recorded by the SHA-256
+    of the body and region, so that unchanged templates do not need to be validated again.
+    """
+
+    def __init__(self, paco_ctx):
+        self.paco_ctx = paco_ctx
+        self.path = os.path.join(paco_ctx.build_folder, 'StackStore.db')
+        self.lock = threading.RLock()
+        self.conn = None
+        self.changed_outputs_keys = set()
+        self.validations_cleared = False
+
+    def connect(self):
+        if self.conn != None:
+            return self.conn
+        pathlib.Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS stacks (
+                    stack_key TEXT PRIMARY KEY,
+                    cache_id TEXT,
+                    outputs_key TEXT,
+                    outputs TEXT,
+                    parameters TEXT,
+                    status TEXT
+                )"""
+            )
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS validations (
+                    body_hash TEXT,
+                    aws_region TEXT,
+                    PRIMARY KEY (body_hash, aws_region)
+                )"""
+            )
+        return self.conn
+
+    def get(self, stack_key, column):
+        with self.lock:
+            row = self.connect().execute(
+                'SELECT {} FROM stacks WHERE stack_key = ?'.format(column),
+                (stack_key,)
+            ).fetchone()
+        if row == None:
+            return None
+        return row[0]
+
+    def update(self, stack_key, **columns):
+        "Insert or update columns for a Stack in a single transaction"
+        for column in columns.keys():
+            if column not in STORE_COLUMNS:
+                raise KeyError("Unknown StackStore column: {}".format(column))
+        names = ', '.join(columns.keys())
+        placeholders = ', '.join(['?'] * len(columns))
+        updates = ', '.join(['{0} = excluded.{0}'.format(column) for column in columns.keys()])
+        with self.lock:
+            conn = self.connect()
+            with conn:
+                conn.execute(
+                    'INSERT INTO stacks (stack_key, {}) VALUES (?, {}) ON CONFLICT(stack_key) DO UPDATE SET {}'.format(
+                        names, placeholders, updates
+                    ),
+                    [stack_key] + list(columns.values())
+                )
+
+    def delete(self, stack_key):
+        with self.lock:
+            conn = self.connect()
+            with conn:
+                conn.execute('DELETE FROM stacks WHERE stack_key = ?', (stack_key,))
+
+    def load_legacy_file(self, legacy_path):
+        "Load a file written by an earlier version of Paco"
+        if legacy_path == None or os.path.isfile(legacy_path) == False:
+            return None
+        with open(legacy_path, 'r') as legacy_fd:
+            return yaml.load(legacy_fd)
+
+    def get_cache_id(self, stack_key, legacy_path=None):
+        cache_id = self.get(stack_key, 'cache_id')
+        if cache_id == None and legacy_path != None and os.path.isfile(legacy_path):
+            with open(legacy_path, 'r') as cache_fd:
+                cache_id = cache_fd.read()
+        return cache_id
+
+    def set_cache_id(self, stack_key, cache_id):
+        self.update(stack_key, cache_id=cache_id)
+
+    def get_outputs(self, stack_key, legacy_path=None):
+        outputs = self.get(stack_key, 'outputs')
+        if outputs == None:
+            return self.load_legacy_file(legacy_path)
+        return json.loads(outputs)
+
+    def set_outputs(self, stack_key, outputs_dict):
+        "Save a Stack's outputs. Outputs dicts have a single key which names the Outputs/<key>.yaml file."
+        outputs_key = None
+        if len(outputs_dict.keys()) > 0:
+            outputs_key = list(outputs_dict.keys())[0]
+        with self.lock:
+            self.update(stack_key, outputs_key=outputs_key, outputs=json.dumps(outputs_dict))
+            if outputs_key != None:
+                self.changed_outputs_keys.add(outputs_key)
+        self.paco_ctx.invalidate_ref_cache()
+
+    def get_parameters(self, stack_key, legacy_path=None):
+        parameters = self.get(stack_key, 'parameters')
+        if parameters == None:
+            return self.load_legacy_file(legacy_path)
+        return json.loads(parameters)
+
+    def set_parameters(self, stack_key, parameter_list):
+        self.update(stack_key, parameters=json.dumps(parameter_list))
+
+    def set_status(self, stack_key, status):
+        self.update(stack_key, status=status)
+
+    def get_body_hash(self, body):
+        return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+    def is_template_validated(self, body, aws_region):
+        """
+        Returns True if a template body has passed validation in a region. The validation
+        cache is cleared the first time it is checked with --nocache.
+        """
+        with self.lock:
+            conn = self.connect()
+            if self.paco_ctx.nocache == True:
+                if self.validations_cleared == False:
+                    with conn:
+                        conn.execute('DELETE FROM validations')
+                    self.validations_cleared = True
+                return False
+            row = conn.execute(
+                'SELECT 1 FROM validations WHERE body_hash = ? AND aws_region = ?',
+                (self.get_body_hash(body), aws_region)
+            ).fetchone()
+        return row != None
+
+    def set_template_validated(self, body, aws_region):
+        with self.lock:
+            conn = self.connect()
+            with conn:
+                conn.execute(
+                    'INSERT OR IGNORE INTO validations (body_hash, aws_region) VALUES (?, ?)',
+                    (self.get_body_hash(body), aws_region)
+                )
+
+    def get_outputs_path(self, outputs_key):
+        return pathlib.Path(os.path.join(self.paco_ctx.home, 'Outputs', outputs_key + '.yaml'))
+
+    def get_outputs_by_key(self, outputs_key):
+        "All of the outputs saved for an Outputs/<key>.yaml file"
+        outputs_dict = self.load_legacy_file(self.get_outputs_path(outputs_key))
+        if outputs_dict == None:
+            outputs_dict = {}
+        with self.lock:
+            rows = self.connect().execute(
+                'SELECT outputs FROM stacks WHERE outputs_key = ?',
+                (outputs_key,)
+            ).fetchall()
+        for row in rows:
+            outputs_dict = dict_of_dicts_merge(outputs_dict, json.loads(row[0]))
+        return outputs_dict
+
+    def export(self):
+        "Write the Outputs/<key>.yaml files for outputs that have changed"
+        with self.lock:
+            for outputs_key in sorted(self.changed_outputs_keys):
+                outputs_dict = self.get_outputs_by_key(outputs_key)
+                outputs_path = self.get_outputs_path(outputs_key)
+                outputs_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(outputs_path, 'w') as output_fd:
+                    yaml.dump(outputs_dict, output_fd)
+            if len(self.changed_outputs_keys) > 0:
+                self.paco_ctx.invalidate_ref_cache()
+            self.changed_outputs_keys = set()
+
+
+stack_stores = {}
+stack_stores_lock = threading.Lock()
+
+def get_stack_store(paco_ctx):
+    "Returns the StackStore for a project"
+    with stack_stores_lock:
+        if paco_ctx.build_folder not in stack_stores:
+            stack_stores[paco_ctx.build_folder] = StackStore(paco_ctx)
+        return stack_stores[paco_ctx.build_folder]
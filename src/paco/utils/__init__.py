@@ -11,8 +11,10 @@ Here be utils.
 """
 
 import hashlib
+import os
 from paco.core.exception import StackException, PacoErrorCode
-from paco.models import schemas
+from paco.models import references, schemas
+from paco.models.loader import get_all_nodes
 from paco.models.locations import get_parent_by_interface
 from copy import deepcopy
 from functools import partial
@@ -85,6 +87,21 @@ def md5sum(filename=None, str_data=None):
 
     return d.hexdigest()
 
+def write_if_changed(path, data):
+    """Writes bytes to a file unless the file already contains them. The file is replaced
+    atomically so that it is never left partly written. Returns True if the file was written."""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    tmp_path = str(path) + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
 def dict_of_dicts_merge(x, y):
     """Merge to dictionaries of dictionaries"""
     z = {}
@@ -169,3 +186,17 @@ def list_to_comma_string(list_to_convert):
         str_list += comma + item
         comma = ','
     return str_list
+
+def get_model_refs(model_obj):
+    "Returns the set of Paco reference strings used by a model object and all of it's children"
+    refs = set()
+    for node in get_all_nodes(model_obj):
+        for value in getattr(node, '__dict__', {}).values():
+            if isinstance(value, str):
+                value = [value]
+            elif isinstance(value, (list, tuple)) == False:
+                continue
+            for item in value:
+                if references.is_ref(item):
+                    refs.add(item)
+    return refs
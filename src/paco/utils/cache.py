@@ -1,62 +1,202 @@
 """
 Cache the model after it has been parsed from YAML to speed up subsequent runs
+
+The credentials are never cached, they are loaded from .credentials.yaml on every run.
 """
 
-import paco.models
+import hashlib
+import json
 import os
 import os.path
 import pathlib
 import pickle
+import pkg_resources
+import sys
+import paco.models.services
+from paco.core.yaml import read_yaml_file
 from paco.models import load_project_from_yaml
+from paco.models.loader import apply_attributes_from_config
+from paco.models.project import Credentials
+
+
+# Bump when the format of the cache changes
+CACHE_VERSION = 2
+# Fixed so that the cache can be read by every supported Python version
+PICKLE_PROTOCOL = 4
+EXCLUDE_DIRS = ('build',)
+# Folders in the top-level of the project that Paco writes to and are not loaded into the model
+EXCLUDE_PROJECT_DIRS = ('Outputs',)
+# Hidden files in the top-level of the project that are loaded into the model
+INCLUDE_DOT_FILES = ('.credentials.yaml',)
+CREDENTIALS_FILE = '.credentials.yaml'
+
+
+def get_package_version(name):
+    try:
+        return pkg_resources.get_distribution(name).version
+    except pkg_resources.DistributionNotFound:
+        return 'unknown'
+
+def get_cache_versions():
+    "Versions that must match for a cached model to be loaded"
+    return {
+        'cache': CACHE_VERSION,
+        'python': '{}.{}'.format(sys.version_info[0], sys.version_info[1]),
+        'paco-cloud': get_package_version('paco-cloud'),
+        'paco.models': get_package_version('paco.models'),
+    }
 
+def sha256sum(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as fd:
+        for block in iter(lambda: fd.read(65536), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
 
-def get_max_mtime(path, exclude):
+def get_project_files(project_path):
+    "Paths relative to the project of every file that could be loaded into the model"
+    project_files = []
+    for root, dirs, files in os.walk(project_path, topdown=True):
+        dirs[:] = sorted([d for d in dirs if d not in EXCLUDE_DIRS and d.startswith('.') == False])
+        if root == os.fspath(project_path):
+            dirs[:] = [d for d in dirs if d not in EXCLUDE_PROJECT_DIRS]
+        for file in sorted(files):
+            if file.startswith('.') and (file not in INCLUDE_DOT_FILES or root != os.fspath(project_path)):
+                continue
+            project_files.append(os.path.relpath(os.path.join(root, file), project_path))
+    return project_files
+
+def get_manifest(project_path, old_manifest=None):
     """
-    Get the most recently modified time in a directory
+    Returns a manifest of the mtime, size and SHA-256 of every project file.
+    Files with the same mtime and size as in the old_manifest are not hashed again.
     """
-    mtimes = []
-    for root, dirs, files in os.walk(path, topdown=True):
-        dirs[:] = [d for d in dirs if d not in exclude]
-        mtimes.append(os.path.getmtime(root))
-        for file in files:
-            mtimes.append(os.path.getmtime(root + os.sep + file))
-    return max(mtimes)
-
-def load_cached_project(project_path):
+    if old_manifest == None:
+        old_manifest = {}
+    manifest = {}
+    for file_path in get_project_files(project_path):
+        stat = os.stat(os.path.join(project_path, file_path))
+        old_entry = old_manifest.get(file_path, None)
+        if old_entry != None and old_entry['mtime'] == stat.st_mtime_ns and old_entry['size'] == stat.st_size:
+            sha256 = old_entry['sha256']
+        else:
+            sha256 = sha256sum(os.path.join(project_path, file_path))
+        manifest[file_path] = {
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': sha256,
+        }
+    return manifest
+
+def is_manifest_changed(old_manifest, new_manifest):
+    if old_manifest.keys() != new_manifest.keys():
+        return True
+    for file_path, entry in new_manifest.items():
+        if old_manifest[file_path]['sha256'] != entry['sha256']:
+            return True
+    return False
+
+def init_service_extensions(project_path):
     """
-    Creates or updates the paco model cache if any files have been modified since
-    the last cache time
+    Imports the Service plug-ins and runs their EXTEND_BASE_MODEL_HOOKS, as the YAML loader does
+    before it loads a project, so that a model loaded from the cache has the same schemas.
+    """
+    if hasattr(paco.models.services, 'list_enabled_services'):
+        paco.models.services.list_enabled_services(pathlib.Path(project_path))
+    else:
+        paco.models.services.list_service_plugins()
+    try:
+        from paco.models.registry import EXTEND_BASE_MODEL_HOOKS
+    except ImportError:
+        # older paco.models do not have extension hooks
+        return
+    for hook in EXTEND_BASE_MODEL_HOOKS:
+        hook()
+
+def set_credentials(project, credentials):
+    project.credentials = credentials
+    project['credentials'] = credentials
+
+def new_credentials(project):
+    credentials = Credentials('credentials', project)
+    credentials.title = 'Administrator Credentials'
+    return credentials
+
+def load_credentials(project, project_path):
+    "Loads .credentials.yaml into a cached project, which is stored without credentials"
+    credentials = new_credentials(project)
+    credentials_path = os.path.join(project_path, CREDENTIALS_FILE)
+    if os.path.isfile(credentials_path):
+        apply_attributes_from_config(
+            credentials,
+            read_yaml_file(credentials_path),
+            project_path,
+            read_file_path=credentials_path
+        )
+    set_credentials(project, credentials)
+
+def dump_project(project):
+    "Pickles a project without it's credentials"
+    credentials = project['credentials']
+    set_credentials(project, new_credentials(project))
+    try:
+        return pickle.dumps(project, protocol=PICKLE_PROTOCOL)
+    finally:
+        set_credentials(project, credentials)
+
+def write_atomic(path, data, mode):
+    tmp_path = str(path) + '.tmp'
+    with open(tmp_path, mode) as fd:
+        fd.write(data)
+    os.replace(tmp_path, path)
+
+def load_cached_project(project_path, refresh=False):
+    """
+    Loads the paco model from the cache if no project files have changed since the
+    cache was created, otherwise the model is loaded from YAML and cached.
+
+    Files are compared by SHA-256, a file is only hashed again if it's mtime or size
+    has changed. The cache is not used if it was created by a different version of
+    Python, paco or paco.models or if it can not be read. If refresh is True, the
+    model is always loaded from YAML.
+
+    The cached model does not contain the credentials, these are loaded from
+    .credentials.yaml every time.
     """
-    last_mtime = get_max_mtime(project_path, exclude=('build'))
     cache_dir = os.path.join(project_path, "build")
-    mtime_cache_file = os.path.join(cache_dir, "cache_last_mtime.txt")
-    model_cache_file = os.path.join(cache_dir, "cache_model.pickle")
+    manifest_file = os.path.join(cache_dir, "model_cache_manifest.json")
+    model_cache_file = os.path.join(cache_dir, "model_cache.pickle")
     pathlib.Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    versions = get_cache_versions()
 
-    # no last modified time cache file, so load project and cache it
-    if not os.path.isfile(mtime_cache_file):
-        with open(mtime_cache_file, 'w') as cache_file:
-            cache_file.write(str(last_mtime))
-        project = load_project_from_yaml(project_path, None)
-        with open(model_cache_file, 'wb') as model_cache_file:
-            pickle.dump(project, model_cache_file)
+    old_manifest = None
+    try:
+        with open(manifest_file, 'r') as fd:
+            cache_info = json.load(fd)
+        if cache_info['versions'] == versions:
+            old_manifest = cache_info['manifest']
+    except (OSError, ValueError, KeyError):
+        pass
 
-    # already cached, either update the cache or use it
-    else:
-        with open(mtime_cache_file) as cache_file:
-            cache_mtime = cache_file.readlines()
-        cache_mtime = float(cache_mtime[0])
-        # if you CTRL-C right after running paco, you can create the mtime file but not the pickle cache
-        if cache_mtime < last_mtime or not os.path.isfile(model_cache_file):
-            # cache is stale
-            project = load_project_from_yaml(project_path, None)
-            with open(model_cache_file, 'wb') as model_cache_file:
-                pickle.dump(project, model_cache_file)
-            with open(mtime_cache_file, 'w') as cache_file:
-                cache_file.write(str(last_mtime))
-        else:
-            # good to go - return the cache
-            with open(model_cache_file, 'rb') as model_cache_file:
-                project = pickle.load(model_cache_file)
+    manifest = get_manifest(project_path, old_manifest)
+    if refresh == False and old_manifest != None and is_manifest_changed(old_manifest, manifest) == False:
+        init_service_extensions(project_path)
+        project = None
+        try:
+            with open(model_cache_file, 'rb') as fd:
+                project = pickle.load(fd)
+        except Exception:
+            # unreadable cache, load the project from YAML
+            pass
+        if project != None:
+            load_credentials(project, project_path)
+            return project
 
+    project = load_project_from_yaml(project_path, None)
+    try:
+        write_atomic(model_cache_file, dump_project(project), 'wb')
+        write_atomic(manifest_file, json.dumps({'versions': versions, 'manifest': manifest}), 'w')
+    except (OSError, pickle.PicklingError, AttributeError, TypeError, RecursionError):
+        # a model that can not be cached is still usable
+        pass
     return project
@@ -0,0 +1,73 @@
+import os
+import types
+import pytest
+
+pytest.importorskip('paco.models')
+from paco.models.project import Project
+from paco.utils import cache
+
+
+CREDENTIALS = """
+aws_access_key_id: AKIAEXAMPLE
+aws_secret_access_key: {}
+aws_default_region: us-west-2
+"""
+
+def write_credentials(project_path, secret):
+    path = project_path / '.credentials.yaml'
+    if path.exists():
+        path.chmod(0o600)
+    path.write_text(CREDENTIALS.format(secret))
+    path.chmod(0o400)
+
+
+class CountingLoader():
+    "Loads a minimal project in place of the YAML loader and counts the loads"
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, project_path, config_processor):
+        self.count += 1
+        project = Project('test', None)
+        cache.load_credentials(project, project_path)
+        return project
+
+
+def test_credentials_invalidate_cache_and_are_not_cached(tmp_path, monkeypatch):
+    loader = CountingLoader()
+    monkeypatch.setattr(cache, 'load_project_from_yaml', loader)
+    (tmp_path / 'project.yaml').write_text('name: test\n')
+    write_credentials(tmp_path, 'first-secret')
+
+    cache.load_cached_project(tmp_path)
+    project = cache.load_cached_project(tmp_path)
+    assert loader.count == 1
+    assert project['credentials'].aws_secret_access_key == 'first-secret'
+    assert project.credentials is project['credentials']
+    with open(tmp_path / 'build' / 'model_cache.pickle', 'rb') as fd:
+        assert b'first-secret' not in fd.read()
+
+    write_credentials(tmp_path, 'second-secret')
+    project = cache.load_cached_project(tmp_path)
+    assert loader.count == 2
+    assert project['credentials'].aws_secret_access_key == 'second-secret'
+
+def test_provision_outputs_do_not_invalidate_cache(tmp_path, monkeypatch):
+    stack_store = pytest.importorskip('paco.stack_group.stack_store')
+    loader = CountingLoader()
+    monkeypatch.setattr(cache, 'load_project_from_yaml', loader)
+    (tmp_path / 'project.yaml').write_text('name: test\n')
+    cache.load_cached_project(tmp_path)
+
+    paco_ctx = types.SimpleNamespace(
+        home=str(tmp_path),
+        build_folder=str(tmp_path / 'build'),
+        invalidate_ref_cache=lambda: None,
+    )
+    store = stack_store.StackStore(paco_ctx)
+    store.set_outputs('NetworkEnvironments/test/vpc.yaml', {'test-vpc': {'VPC': 'vpc-123'}})
+    store.export()
+    assert (tmp_path / 'Outputs' / 'test-vpc.yaml').exists()
+
+    cache.load_cached_project(tmp_path)
+    assert loader.count == 1